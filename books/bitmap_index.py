@@ -0,0 +1,275 @@
+"""Compressed bitmap indexes over the categorical columns of the raw frames.
+
+Each distinct value of an indexed column (state, district, pincode prefix,
+month) maps to a roaring-style bitmap of the row numbers holding it. Row ids
+are split on their high 16 bits into chunks. Each chunk is stored either as a
+sorted ``uint16`` array (sparse, up to 4096 rows) or as a 1024-word ``uint64``
+bitmap (dense), whichever is smaller. Filters combine with ``&`` and ``|``
+chunk by chunk, and only the surviving row ids are gathered for aggregation:
+
+    idx = pipeline.demo_bitmaps
+    sel = idx.eq("state", "Bihar") & idx.between("month", "2025-04", "2025-06")
+    idx.sum(sel, ["demo_age_5_17", "demo_age_17_"])
+    idx.groupby_sum(sel, "district", ["demo_activity"])
+
+Pure NumPy; no roaring library is needed.
+"""
+
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+CHUNK_BITS = 16
+CHUNK_SIZE = 1 << CHUNK_BITS
+ARRAY_MAX = 4096
+WORDS = CHUNK_SIZE // 64
+
+
+# %% Containers
+
+def _is_words(container):
+    return container.dtype == np.uint64
+
+
+def _to_words(low):
+    bits = np.zeros(CHUNK_SIZE, dtype=bool)
+    bits[low] = True
+    return np.packbits(bits, bitorder="little").view(np.uint64)
+
+
+def _to_bits(words):
+    return np.unpackbits(words.view(np.uint8), bitorder="little").view(bool)
+
+
+def _to_low(words):
+    return np.flatnonzero(_to_bits(words)).astype(np.uint16)
+
+
+if hasattr(np, "bitwise_count"):       # NumPy >= 2.0
+    def _popcount(words):
+        return int(np.bitwise_count(words).sum())
+else:
+    def _popcount(words):
+        return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+def _cardinality(container):
+    return _popcount(container) if _is_words(container) else len(container)
+
+
+def _merge_unique(a, b):
+    merged = np.concatenate([a, b])
+    merged.sort()
+    return merged[np.r_[True, merged[1:] != merged[:-1]]]
+
+
+def _shrink(words):
+    """Convert a dense container back to an array once it is sparse enough."""
+    return _to_low(words) if _cardinality(words) <= ARRAY_MAX else words
+
+
+def _and(a, b):
+    if _is_words(a) and _is_words(b):
+        return _shrink(a & b)
+    if _is_words(a):
+        a, b = b, a
+    if _is_words(b):
+        return a[_to_bits(b)[a]]
+    return np.intersect1d(a, b, assume_unique=True)
+
+
+def _or(a, b):
+    if not _is_words(a) and not _is_words(b):
+        union = _merge_unique(a, b)
+        return union if len(union) <= ARRAY_MAX else _to_words(union)
+    a = a if _is_words(a) else _to_words(a)
+    b = b if _is_words(b) else _to_words(b)
+    return a | b
+
+
+# %% Bitmap
+
+class RoaringBitmap:
+    """Set of row ids stored as per-chunk array or bitmap containers."""
+
+    __slots__ = ("keys", "containers")
+
+    def __init__(self, keys=None, containers=None):
+        self.keys = np.asarray(keys if keys is not None else [], dtype=np.int64)
+        self.containers = containers or []
+
+    @classmethod
+    def from_sorted(cls, rows):
+        """Build from sorted, unique, non-negative row ids."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if not len(rows):
+            return cls()
+        high = rows >> CHUNK_BITS
+        starts = np.flatnonzero(np.r_[True, high[1:] != high[:-1]])
+        stops = np.r_[starts[1:], len(rows)]
+        containers = []
+        for start, stop in zip(starts, stops):
+            low = (rows[start:stop] & (CHUNK_SIZE - 1)).astype(np.uint16)
+            containers.append(low if len(low) <= ARRAY_MAX else _to_words(low))
+        return cls(high[starts], containers)
+
+    def __len__(self):
+        return sum(_cardinality(c) for c in self.containers)
+
+    def __and__(self, other):
+        common, ia, ib = np.intersect1d(self.keys, other.keys, return_indices=True)
+        keys, containers = [], []
+        for key, i, j in zip(common, ia, ib):
+            container = _and(self.containers[i], other.containers[j])
+            if _cardinality(container):
+                keys.append(key)
+                containers.append(container)
+        return RoaringBitmap(keys, containers)
+
+    def __or__(self, other):
+        keys = np.union1d(self.keys, other.keys)
+        pos_a = dict(zip(self.keys.tolist(), range(len(self.keys))))
+        pos_b = dict(zip(other.keys.tolist(), range(len(other.keys))))
+        containers = []
+        for key in keys.tolist():
+            if key in pos_a and key in pos_b:
+                containers.append(_or(self.containers[pos_a[key]], other.containers[pos_b[key]]))
+            elif key in pos_a:
+                containers.append(self.containers[pos_a[key]])
+            else:
+                containers.append(other.containers[pos_b[key]])
+        return RoaringBitmap(keys, containers)
+
+    def to_array(self):
+        """Sorted row ids as an ``int64`` array."""
+        if not self.containers:
+            return np.empty(0, dtype=np.int64)
+        parts = []
+        for key, container in zip(self.keys.tolist(), self.containers):
+            low = _to_low(container) if _is_words(container) else container
+            parts.append(low.astype(np.int64) + (key << CHUNK_BITS))
+        return np.concatenate(parts)
+
+    def nbytes(self):
+        return sum(c.nbytes for c in self.containers) + self.keys.nbytes
+
+
+def union_all(bitmaps):
+    bitmaps = list(bitmaps)
+    return reduce(lambda a, b: a | b, bitmaps) if bitmaps else RoaringBitmap()
+
+
+# %% Frame index
+
+class FrameBitmapIndex:
+    """Bitmap indexes over selected columns of a frame, plus aggregation."""
+
+    def __init__(self, df, columns):
+        """``columns`` maps an index name to a row-aligned Series or a list of
+        column names (indexed on their value tuples)."""
+        self.df = df
+        self.codes = {}
+        self.values = {}
+        self.bitmaps = {}
+        for name, spec in columns.items():
+            codes, uniques = _factorize(df, spec)
+            self.codes[name] = codes
+            self.values[name] = {value: i for i, value in enumerate(uniques)}
+
+            # Row ids grouped by code, each group already sorted. Small codes
+            # take NumPy's radix sort path for a stable argsort. Missing
+            # values (code -1) belong to no bitmap.
+            rows = np.flatnonzero(codes >= 0)
+            valid = codes[rows]
+            small = valid.astype(np.uint16) if len(uniques) < CHUNK_SIZE - 1 else valid
+            order = rows[np.argsort(small, kind="stable")]
+            bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            self.bitmaps[name] = [
+                RoaringBitmap.from_sorted(order[bounds[i]:bounds[i + 1]])
+                for i in range(len(uniques))
+            ]
+        self._arrays = {}
+
+    # Filters
+
+    def eq(self, name, value):
+        code = self.values[name].get(value)
+        return self.bitmaps[name][code] if code is not None else RoaringBitmap()
+
+    def isin(self, name, values):
+        return union_all(self.eq(name, v) for v in values)
+
+    def between(self, name, low, high):
+        """Rows whose ``name`` value lies in ``[low, high]`` (values must be orderable)."""
+        lookup = self.values[name]
+        sample = next(iter(lookup))
+        if isinstance(sample, pd.Period):
+            low, high = pd.Period(low, sample.freq), pd.Period(high, sample.freq)
+        return union_all(self.bitmaps[name][code] for value, code in lookup.items() if low <= value <= high)
+
+    # Aggregation
+
+    def _array(self, column):
+        if column not in self._arrays:
+            self._arrays[column] = self.df[column].to_numpy()
+        return self._arrays[column]
+
+    def sum(self, bitmap, columns):
+        rows = bitmap.to_array()
+        return pd.Series({c: self._array(c)[rows].sum() for c in columns})
+
+    def groupby_sum(self, bitmap, name, columns):
+        """Per-``name`` sums of ``columns`` over the selected rows."""
+        rows = bitmap.to_array()
+        codes = self.codes[name][rows]
+        rows, codes = rows[codes >= 0], codes[codes >= 0]
+        n = len(self.values[name])
+        sums = pd.DataFrame(
+            {c: np.bincount(codes, weights=self._array(c)[rows], minlength=n) for c in columns},
+            index=pd.Index(list(self.values[name]), name=name, tupleize_cols=False),
+        )
+        return sums[np.bincount(codes, minlength=n) > 0]
+
+    def nbytes(self):
+        return sum(b.nbytes() for bitmaps in self.bitmaps.values() for b in bitmaps)
+
+
+def _factorize(df, spec):
+    """Sorted codes and unique values of a Series, or of column tuples.
+
+    Tuples are factorized column by column and combined as integers, which
+    avoids materializing one Python tuple per row.
+    """
+    if not isinstance(spec, list):
+        return pd.factorize(spec, sort=True)
+
+    combined = np.zeros(len(df), dtype=np.int64)
+    missing = np.zeros(len(df), dtype=bool)
+    levels = []
+    for column in spec:
+        codes, uniques = pd.factorize(df[column], sort=True)
+        combined = combined * (len(uniques) + 1) + codes
+        missing |= codes < 0
+        levels.append(uniques)
+
+    codes = np.full(len(df), -1, dtype=np.intp)
+    codes[~missing], uniques = pd.factorize(combined[~missing], sort=True)
+    values = []
+    for value in uniques:
+        parts = []
+        for level in reversed(levels):
+            value, code = divmod(value, len(level) + 1)
+            parts.append(level[code])
+        values.append(tuple(reversed(parts)))
+    return codes, values
+
+
+def build_frame_index(df):
+    """Index state, (state, district), 3-digit pincode prefix and month."""
+    return FrameBitmapIndex(df, {
+        "state": df["state"],
+        "district": ["state", "district"],
+        "prefix": df["pincode"] // 1000,
+        "month": df["month"],
+    })
@@ -18,226 +18,93 @@
 
 # %%
 import pandas as pd
-import numpy as np
 
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-# %%
-plt.rcParams["figure.figsize"] = (12, 8)
-plt.rcParams["figure.dpi"] = 150          # display resolution
-plt.rcParams["savefig.dpi"] = 300         # saved image quality
-
-# %% [markdown]
-# ## Load Datasets
-
-# %%
-ENROL1_PATH = 'data/raw/api_data_aadhar_enrolment/api_data_aadhar_enrolment_0_500000.csv'
-ENROL2_PATH = 'data/raw/api_data_aadhar_enrolment/api_data_aadhar_enrolment_500000_1000000.csv'
-ENROL3_PATH = 'data/raw/api_data_aadhar_enrolment/api_data_aadhar_enrolment_1000000_1006029.csv'
-
-DEMO1_PATH = 'data/raw/api_data_aadhar_demographic/api_data_aadhar_demographic_0_500000.csv'
-DEMO2_PATH = 'data/raw/api_data_aadhar_demographic/api_data_aadhar_demographic_500000_1000000.csv'
-DEMO3_PATH = 'data/raw/api_data_aadhar_demographic/api_data_aadhar_demographic_1000000_1500000.csv'
-DEMO4_PATH = 'data/raw/api_data_aadhar_demographic/api_data_aadhar_demographic_1500000_2000000.csv'
-DEMO5_PATH = 'data/raw/api_data_aadhar_demographic/api_data_aadhar_demographic_2000000_2071700.csv'
-
-BIO1_PATH = 'data/raw/api_data_aadhar_biometric/api_data_aadhar_biometric_0_500000.csv'
-BIO2_PATH = 'data/raw/api_data_aadhar_biometric/api_data_aadhar_biometric_500000_1000000.csv'
-BIO3_PATH = 'data/raw/api_data_aadhar_biometric/api_data_aadhar_biometric_1000000_1500000.csv'
-BIO4_PATH = 'data/raw/api_data_aadhar_biometric/api_data_aadhar_biometric_1500000_1861108.csv'
-
-# %%
-enrol1= pd.read_csv(ENROL1_PATH)
-enrol2= pd.read_csv(ENROL2_PATH)
-enrol3= pd.read_csv(ENROL3_PATH)
-
-demo1= pd.read_csv(DEMO1_PATH)
-demo2= pd.read_csv(DEMO2_PATH)
-demo3= pd.read_csv(DEMO3_PATH)
-demo4= pd.read_csv(DEMO4_PATH)
-demo5= pd.read_csv(DEMO5_PATH)
-
-bio1= pd.read_csv(BIO1_PATH)
-bio2= pd.read_csv(BIO2_PATH)
-bio3= pd.read_csv(BIO3_PATH)
-bio4= pd.read_csv(BIO4_PATH)
-
-# %% [markdown]
-# ## Minimal Cleaning & Alignment
-
-# %%
-enrol= pd.concat([enrol1, enrol2, enrol3], ignore_index= True)
-
-# %%
-demo= pd.concat([demo1, demo2, demo3, demo4, demo5], ignore_index= True)
-bio= pd.concat([bio1, bio2, bio3, bio4], ignore_index= True)
-
-# %% [markdown]
-# ## Date Processing
-
-# %%
-enrol['date'] = pd.to_datetime(enrol['date'], format='%d-%m-%Y')
-enrol['month'] = enrol['date'].dt.to_period('M')
-
-demo['date'] = pd.to_datetime(demo['date'], format='%d-%m-%Y')
-demo['month'] = demo['date'].dt.to_period('M')
-
-bio['date'] = pd.to_datetime(bio['date'], format='%d-%m-%Y')
-bio['month'] = bio['date'].dt.to_period('M')
-
-# %% [markdown]
-# ## Feature Engineering
-
-# %%
-enrol["total_enrolments"] = (
-    enrol["age_0_5"] +
-    enrol["age_5_17"] +
-    enrol["age_18_greater"]
-)
-
-# %%
-demo["demo_activity"] = (
-    demo["demo_age_5_17"] +
-    demo["demo_age_17_"]
-)
-bio["bio_activity"] = (
-    bio["bio_age_5_17"] +
-    bio["bio_age_17_"]
+from pipeline import (
+    PREVIEW_RATE, load_source, dedup_report,
+    build_monthly_load, build_consistency_metrics,
+    build_pincode_df, build_district_df, add_sampling_errors,
+    find_hotspots, find_top_districts, build_pincode_top, find_gravity_pincodes,
 )
 
 # %% [markdown]
-# ## Calculate Monthly Volatility (Consistency Check)
-
-# %%
-monthly_demo = (
-    demo.groupby(['state', 'district', 'pincode', 'month'], as_index=False)
-        ['demo_activity'].sum()
-)
-
-monthly_bio = (
-    bio.groupby(['state', 'district', 'pincode', 'month'], as_index=False)
-       ['bio_activity'].sum()
-)
-
-monthly_load = monthly_demo.merge(
-    monthly_bio,
-    on=['state', 'district', 'pincode', 'month'],
-    how='outer'
-)
-monthly_load.fillna(0, inplace=True)
-
-monthly_load['monthly_total'] = (
-    monthly_load['demo_activity'] +
-    monthly_load['bio_activity']
-)
+# ## Load Datasets, Date Processing & Feature Engineering
+#
+# The compute steps live in `pipeline.py` so that book2/book3 (and batch jobs)
+# can reuse them without importing the plotting stack.
+#
+# For a quick preview run set `UIDAI_PREVIEW_RATE` (e.g. `0.05`) before
+# starting the kernel: every source is then a stratified sample by state and
+# district, sums are scaled back up, and the pincode/district tables carry
+# `*_se` standard errors.
+#
+# Each slice is deduplicated against the row hashes of the other slices of its
+# source (persisted under `data/dedup/`), so overlapping or re-exported ranges
+# are counted once. The report lists the rows dropped per slice.
 
 # %%
-consistency_metrics = (
-    monthly_load.groupby(['state', 'district', 'pincode'])['monthly_total']
-                .agg(['mean', 'std'])
-                .reset_index()
-)
+print(f"Preview rate: {PREVIEW_RATE}" if PREVIEW_RATE else "Full run")
 
-consistency_metrics.rename(
-    columns={'mean': 'avg_monthly_load', 'std': 'load_volatility'},
-    inplace=True
-)
+enrol = load_source("enrol")
+demo = load_source("demo")
+bio = load_source("bio")
 
-consistency_metrics['load_volatility'] = consistency_metrics['load_volatility'].fillna(0)
+dedup_report()
 
 # %% [markdown]
-# ## Aggregate at Pincode Level
+# ## Calculate Monthly Volatility (Consistency Check)
 
 # %%
-enrol_pin = (
-    enrol.groupby(["state", "district", "pincode"], as_index=False)
-         ["total_enrolments"]
-         .sum()
-)
-
-demo_pin = (
-    demo.groupby(["state", "district", "pincode"], as_index=False)
-        ["demo_activity"]
-        .sum()
-)
-
-bio_pin = (
-    bio.groupby(["state", "district", "pincode"], as_index=False)
-       ["bio_activity"]
-       .sum()
-)
+monthly_load = build_monthly_load(demo, bio)
+consistency_metrics = build_consistency_metrics(monthly_load)
 
 # %% [markdown]
-# ## Merge Datasets
+# ## Aggregate at Pincode Level & Compute Operational Load
 
 # %%
-pincode_df = (
-    enrol_pin
-    .merge(demo_pin, on=["state", "district", "pincode"], how="left")
-    .merge(bio_pin, on=["state", "district", "pincode"], how="left")
-    .merge(consistency_metrics, on=["state", "district", "pincode"], how="left")
-)
-
-pincode_df.fillna(0, inplace=True)
+pincode_df = build_pincode_df(enrol, demo, bio, consistency_metrics)
+pincode_df = add_sampling_errors(pincode_df, enrol, demo, bio, ["state", "district", "pincode"])
 
 # %%
 pincode_df.head()
 
 # %% [markdown]
-# ## Compute Operational Load
+# ## Aggregate to District Level (for Hotspot Identification)
 
 # %%
-pincode_df["total_activity"] = (
-    pincode_df["total_enrolments"] +
-    pincode_df["demo_activity"] +
-    pincode_df["bio_activity"]
-)
-pincode_df["activity_per_enrolment"] = (
-    pincode_df["total_activity"] /
-    pincode_df["total_enrolments"].replace(0, np.nan)
-)
+district_df = build_district_df(pincode_df)
+district_df = add_sampling_errors(district_df, enrol, demo, bio, ["state", "district"])
 
 # %% [markdown]
-# ## Aggregate to District Level (for Hotspot Identification)
+# ## Identify Hotspots
 
 # %%
-district_df = (
-    pincode_df.groupby(["state", "district"], as_index=False)
-              .agg({
-                  "total_enrolments": "sum",
-                  "demo_activity": "sum",
-                  "bio_activity": "sum",
-                  "total_activity": "sum",
-                  "avg_monthly_load": "mean",
-                  "load_volatility": "mean"
-              })
-)
+hotspots = find_hotspots(district_df)
 
-district_df["activity_per_enrolment"] = (
-    district_df["total_activity"] /
-    district_df["total_enrolments"].replace(0, np.nan)
-)
+# %%
+hotspots.head()
 
 # %% [markdown]
-# ## Identify Hotspots
+# With `UIDAI_DROP` set (e.g. `2025-12`), the full district and pincode
+# rankings are snapshotted so the next drop can be diffed against this one
+# (`python snapshots.py diff <old> <new>`). Preview runs are never recorded.
 
 # %%
-threshold = district_df["total_activity"].quantile(0.90)
-
-hotspots = district_df[
-    district_df["total_activity"] >= threshold
-].sort_values("total_activity", ascending=False)
+from snapshots import record
 
-# %%
-hotspots.head()
+record(district_df, "hotspots")
+record(pincode_df, "pincode_activity")
 
 # %% [markdown]
 # ## Visualization: Top Load Districts
 
 # %%
+import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 
+plt.rcParams["figure.figsize"] = (12, 8)
+plt.rcParams["figure.dpi"] = 150          # display resolution
+plt.rcParams["savefig.dpi"] = 300         # saved image quality
+
 # 1. Prepare Data for Table
 top10_table = hotspots.head(10).copy().reset_index(drop=True)
 top10_table["rank"] = top10_table.index + 1
@@ -310,6 +177,55 @@ plt.text(0.5, 10.2, "Districts requiring immediate infrastructure review (Top 3
 plt.subplots_adjust(top=0.90, bottom=0.05, left=0.05, right=0.95)
 plt.show()
 
+# %% [markdown]
+# ## Calendar Load Profiles (Staffing Rosters)
+#
+# Dates are reduced to integer day ordinals and summed per district x weekday
+# and district x calendar day with one `bincount` per source (see
+# `calendar_load.py`). Rows are normalized to each district's own total, so the
+# heatmaps show *when* load arrives rather than how much.
+
+# %%
+from calendar_load import build_calendar_profiles, normalize_rows
+
+calendar_profiles = build_calendar_profiles(enrol, demo, bio)
+
+top10_keys = pd.MultiIndex.from_frame(top10_table[["state", "district"]])
+weekday_share = normalize_rows(calendar_profiles["total"]["weekday"].loc[top10_keys])
+daily_share = normalize_rows(calendar_profiles["total"]["daily"].loc[top10_keys])
+
+# %%
+import seaborn as sns
+
+fig, (ax_week, ax_day) = plt.subplots(
+    1, 2, figsize=(18, 7), dpi=150, gridspec_kw={"width_ratios": [1, 3]}
+)
+
+row_labels = weekday_share.index.get_level_values("district")
+
+sns.heatmap(
+    weekday_share, ax=ax_week, cmap="mako_r", annot=True, fmt=".0%",
+    cbar=False, yticklabels=row_labels
+)
+ax_week.set_title("Share of load by weekday", fontsize=14, weight="bold", loc="left")
+
+sns.heatmap(
+    daily_share, ax=ax_day, cmap="mako_r", cbar_kws={"format": "{x:.1%}"},
+    yticklabels=False, xticklabels=14
+)
+ax_day.set_xticklabels(
+    [pd.Timestamp(d).strftime("%d %b") for d in daily_share.columns[::14]], rotation=0
+)
+ax_day.set_title("Share of load by calendar day", fontsize=14, weight="bold", loc="left")
+
+for a in (ax_week, ax_day):
+    a.set_xlabel("")
+    a.set_ylabel("")
+
+fig.suptitle("Calendar Load Profiles: Top 10 Load Districts", fontsize=22, weight="bold")
+plt.tight_layout(rect=[0, 0, 1, 0.94])
+plt.show()
+
 # %% [markdown]
 # ## Insight: Operational Load Hotspots
 #
@@ -327,55 +243,66 @@ plt.show()
 # # Pincode-Level Drill-Down
 
 # %%
-top10_districts = (
-    district_df
-    .sort_values("total_activity", ascending=False)
-    .head(10)[["state", "district"]]
-)
+top10_districts = find_top_districts(district_df)
 
 top10_districts
 
+# %% [markdown]
+# ## Compute Pincode Share Within District
+
 # %%
-pincode_top = pincode_df.merge(
-    top10_districts,
-    on=["state", "district"],
-    how="inner"
-)
+pincode_top = build_pincode_top(pincode_df, top10_districts)
 
 # %%
 pincode_top.head()
 
 # %% [markdown]
-# ## Compute Pincode Share Within District
+# ## Identify Pincode "Gravity Points"
 
 # %%
-pincode_top["district_total_activity"] = (
-    pincode_top.groupby(["state", "district"])["total_activity"]
-               .transform("sum")
-)
+gravity_pincodes = find_gravity_pincodes(pincode_top)
 
-pincode_top["pincode_activity_share"] = (
-    pincode_top["total_activity"] /
-    pincode_top["district_total_activity"]
-)
+gravity_pincodes
 
 # %% [markdown]
-# ## Identify Pincode "Gravity Points"
+# ## Fast Slice-and-Sum on the Raw Rows (Bitmap Indexes)
+#
+# Ad-hoc questions on the raw `demo`/`bio` rows ("monthly biometric load of
+# the top-10 districts since April") would normally mean a full boolean scan
+# per filter. Bitmap indexes over state, district, pincode prefix and month
+# (`bitmap_index.py`) answer them with bitmap AND/OR and a gather of the
+# matching rows only.
 
 # %%
-gravity_pincodes = pincode_top[
-    pincode_top["pincode_activity_share"] >= 0.10
-].sort_values(
-    ["state", "district", "pincode_activity_share"],
-    ascending=False
-)
+from bitmap_index import build_frame_index
 
-gravity_pincodes
+bio_bitmaps = build_frame_index(bio)
+
+top10_rows = bio_bitmaps.isin("district", list(top10_districts.itertuples(index=False, name=None)))
+since_april = bio_bitmaps.between("month", "2025-04", str(bio["month"].max()))
+
+bio_bitmaps.groupby_sum(top10_rows & since_april, "month", ["bio_age_5_17", "bio_age_17_"])
+
+# %% [markdown]
+# ## Concentration Across All Districts
+#
+# `district_df` carries concentration metrics for every district (and its
+# state): HHI and Gini of pincode load, top-3 pincode share and the effective
+# number of pincodes (`1 / HHI`). Ranking by HHI surfaces the districts whose
+# load is most localized, not just the top 10 by volume.
+
+# %%
+district_df.sort_values("pincode_hhi", ascending=False)[
+    ["state", "district", "n_pincodes", "pincode_hhi", "pincode_gini",
+     "top3_pincode_share", "effective_pincodes"]
+].head(10)
 
 # %% [markdown]
 # ## Visualization: Pincode Concentration
 
 # %%
+import seaborn as sns
+
 sns.set_context("talk")
 sns.set_style("white")
 plt.rcParams["figure.figsize"] = (12, 8)
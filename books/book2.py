@@ -17,7 +17,11 @@
 # # Update-Heavy but Enrolment-Light Regions
 
 # %%
-from book1 import pincode_df
+from pipeline import PREVIEW_RATE, MAINTENANCE_QUANTILE, pincode_df, district_df, pincode_index
+from metrics import add_metrics
+from sampling import Z, ratio_se
+from shrinkage import add_shrunk_ratio
+from snapshots import record
 
 import numpy as np
 import matplotlib.pyplot as plt
@@ -25,20 +29,17 @@ import pandas as pd
 import seaborn as sns
 
 # %% [markdown]
-# ## Re-aggregate to District Level & Filter Noise
+# ## District-Level Totals & Name Cleanup
 
 # %%
-# 1. Re-aggregate Pincode data back to District Level for Regional Analysis
-region_df = pincode_df.groupby(['state', 'district'])[[
-    'total_enrolments', 'demo_activity', 'bio_activity'
-]].sum().reset_index()
+# 1. District-level sums of the pincode data (plus standard errors in preview runs)
+region_df = district_df[
+    ['state', 'district', 'total_enrolments', 'demo_activity', 'bio_activity']
+    + [c for c in ['total_enrolments_se', 'demo_activity_se', 'bio_activity_se'] if c in district_df]
+].copy()
 
 # 2. Calculate Total Activity
-region_df["total_activity"] = (
-    region_df["total_enrolments"] +
-    region_df["demo_activity"] +
-    region_df["bio_activity"]
-)
+region_df = add_metrics(region_df, ["total_activity"])
 
 # Fix State Names (Title Case, Strip, and Specific Replacements)
 region_df['state'] = region_df['state'].str.title().str.strip()
@@ -52,31 +53,53 @@ region_df['state'] = region_df['state'].replace({
 # Fix District Typos Globally (e.g. Medchal?malkajgiri)
 region_df['district'] = region_df['district'].astype(str).str.replace('?', '-')
 
-# 3. Apply Minimum Volume Filter (Fixes "Small Number Noise")
-VOLUME_THRESHOLD = 1000
-region_df = region_df[region_df["total_activity"] > VOLUME_THRESHOLD].copy()
+# 3. No volume filter: "small number noise" is handled by empirical-Bayes
+#    shrinkage below, so low-volume districts stay in the analysis
 
 # %%
-print(f"Districts after filtering: {len(region_df)}")
+print(f"Districts: {len(region_df)}")
 region_df.head()
 
 # %% [markdown]
 # ## Compute Update Pressure Metrics
 
 # %%
-region_df["total_updates"] = (
-    region_df["demo_activity"] +
-    region_df["bio_activity"]
-)
+region_df = add_metrics(region_df, ["total_updates", "update_to_enrolment_ratio"])
 
-region_df["update_to_enrolment_ratio"] = (
-    region_df["total_updates"] /
-    region_df["total_enrolments"].replace(0, np.nan)
-)
+# %%
+# Preview runs only: sampling error of the ratio (delta method, 95% bounds)
+if PREVIEW_RATE:
+    region_df["update_to_enrolment_ratio_se"] = ratio_se(
+        region_df["total_updates"],
+        np.hypot(region_df["demo_activity_se"], region_df["bio_activity_se"]),
+        region_df["total_enrolments"],
+        region_df["total_enrolments_se"],
+    )
+    region_df["update_to_enrolment_ratio_lower"] = (
+        region_df["update_to_enrolment_ratio"] - Z * region_df["update_to_enrolment_ratio_se"]
+    )
+    region_df["update_to_enrolment_ratio_upper"] = (
+        region_df["update_to_enrolment_ratio"] + Z * region_df["update_to_enrolment_ratio_se"]
+    )
+
+# %% [markdown]
+# ## Shrink Ratios Toward the State Norm (Empirical Bayes)
+#
+# A district with 3 enrolments and 900 updates has a raw ratio of 300 that
+# says little: the noise is in the 3 enrolments. Each district's share of
+# enrolments in all its activity is shrunk toward the state's typical share
+# (beta-binomial), in proportion to how little volume backs it, and turned
+# back into a ratio with a 90% credible interval. Large districts keep
+# (almost) their raw ratio; districts with no enrolments have no ratio.
 
 # %%
+region_df = add_shrunk_ratio(
+    region_df, "update_to_enrolment_ratio", "total_updates", "total_enrolments"
+)
+
 region_df[
-    ["state", "district", "total_enrolments", "total_updates", "update_to_enrolment_ratio"]
+    ["state", "district", "total_enrolments", "total_updates",
+     "update_to_enrolment_ratio", "update_to_enrolment_ratio_eb"]
 ].describe()
 
 # %% [markdown]
@@ -92,19 +115,19 @@ plt.rcParams["figure.figsize"] = (14, 10)
 plot_data = region_df.copy()
 
 # 2. FILTER OUTLIERS & SELECT TOP STATES
-outliers = plot_data[plot_data["update_to_enrolment_ratio"] > 150].sort_values("update_to_enrolment_ratio", ascending=False)
-normal_data = plot_data[plot_data["update_to_enrolment_ratio"] <= 150]
+outliers = plot_data[plot_data["update_to_enrolment_ratio_eb"] > 150].sort_values("update_to_enrolment_ratio_eb", ascending=False)
+normal_data = plot_data[plot_data["update_to_enrolment_ratio_eb"] <= 150]
 
 # Filter: Only show Top 20 States with the highest 'Max' pressure to reduce clutter
-top_states_list = normal_data.groupby('state')['update_to_enrolment_ratio'].max().sort_values(ascending=False).head(20).index
+top_states_list = normal_data.groupby('state')['update_to_enrolment_ratio_eb'].max().sort_values(ascending=False).head(20).index
 filtered_data = normal_data[normal_data['state'].isin(top_states_list)]
 
 # 3. PLOT: HORIZONTAL STRIP PLOT
 ax = sns.stripplot(
     data=filtered_data,
     y="state",
-    x="update_to_enrolment_ratio",
-    hue="update_to_enrolment_ratio",
+    x="update_to_enrolment_ratio_eb",
+    hue="update_to_enrolment_ratio_eb",
     palette="rocket_r",
     size=7,
     alpha=0.7,
@@ -126,7 +149,7 @@ plt.figtext(0.5, 0.92, "Focusing on districts with ratio < 150. Extreme outliers
 
 # 5. CUSTOMIZE AXES
 plt.ylabel("")
-plt.xlabel("Update-to-Enrolment Ratio (Updates per New Enrolment)")
+plt.xlabel("Update-to-Enrolment Ratio (Updates per New Enrolment, shrunk)")
 
 # Remove Legend
 if ax.legend_:
@@ -135,7 +158,7 @@ if ax.legend_:
 # 6. ADD "OUTLIER BOX"
 if not outliers.empty:
     outlier_text = "!! EXTREME OUTLIERS (OFF-CHART) !!:\n" + "\n".join(
-        [f"• {row['district']} ({row['state']}): {row['update_to_enrolment_ratio']:.0f}" 
+        [f"• {row['district']} ({row['state']}): {row['update_to_enrolment_ratio_eb']:.0f}" 
          for _, row in outliers.head(5).iterrows()]
     )
 
@@ -182,31 +205,38 @@ plt.show()
 # Bio Ratio -> Need for Iris/Fingerprint Scanners
 # Demo Ratio -> Need for Data Entry Terminals
 
-region_df["bio_to_enrol_ratio"] = (
-    region_df["bio_activity"] / region_df["total_enrolments"].replace(0, np.nan)
+# (total_maintenance_ratio = bio + demo ratio, for sorting)
+region_df = add_metrics(
+    region_df, ["bio_to_enrol_ratio", "demo_to_enrol_ratio", "total_maintenance_ratio"]
 )
 
-region_df["demo_to_enrol_ratio"] = (
-    region_df["demo_activity"] / region_df["total_enrolments"].replace(0, np.nan)
-)
+# Shrunk versions, so low-volume districts cannot top the ranking on noise
+region_df = add_shrunk_ratio(region_df, "bio_to_enrol_ratio", "bio_activity", "total_enrolments")
+region_df = add_shrunk_ratio(region_df, "demo_to_enrol_ratio", "demo_activity", "total_enrolments")
 
-# Total Maintenance Ratio (for sorting)
-region_df["total_maintenance_ratio"] = region_df["bio_to_enrol_ratio"] + region_df["demo_to_enrol_ratio"]
+region_df["total_maintenance_ratio_eb"] = (
+    region_df["bio_to_enrol_ratio_eb"] + region_df["demo_to_enrol_ratio_eb"]
+)
 
 # %%
 region_df[
-    ["state", "district", "total_enrolments", "bio_to_enrol_ratio", "demo_to_enrol_ratio", "total_maintenance_ratio"]
+    ["state", "district", "total_enrolments", "bio_to_enrol_ratio", "demo_to_enrol_ratio",
+     "total_maintenance_ratio", "total_maintenance_ratio_eb"]
 ].describe()
 
 # %% [markdown]
 # ## Identify Maintenance-Heavy Districts
 
 # %%
-maintenance_threshold = region_df["total_maintenance_ratio"].quantile(0.90)
+maintenance_threshold = region_df["total_maintenance_ratio_eb"].quantile(MAINTENANCE_QUANTILE)
 
 maintenance_heavy = region_df[
-    region_df["total_maintenance_ratio"] >= maintenance_threshold
-].sort_values("total_maintenance_ratio", ascending=False)
+    region_df["total_maintenance_ratio_eb"] >= maintenance_threshold
+].sort_values("total_maintenance_ratio_eb", ascending=False)
+
+# Snapshot the full ranking for drop-to-drop diffs (only when UIDAI_DROP is set,
+# and never from a preview sample)
+record(region_df, "maintenance_heavy")
 
 # %%
 print(f"Maintenance-heavy districts found: {len(maintenance_heavy)}")
@@ -227,7 +257,7 @@ top10_maintenance['district'] = top10_maintenance['district'].apply(
 
 # Determine Dominant Need for coloring
 def get_dominant_need(row):
-    if row['bio_to_enrol_ratio'] > row['demo_to_enrol_ratio']:
+    if row['bio_to_enrol_ratio_eb'] > row['demo_to_enrol_ratio_eb']:
         return 'Bio-Heavy (Scanners Needed)'
     else:
         return 'Demo-Heavy (Data Entry Needed)'
@@ -244,7 +274,7 @@ sns.set_style("white")
 sns.barplot(
     data=top10_maintenance,
     y="district",
-    x="total_maintenance_ratio",
+    x="total_maintenance_ratio_eb",
     hue="dominant_need",
     palette={"Bio-Heavy (Scanners Needed)": "#e74c3c", "Demo-Heavy (Data Entry Needed)": "#3498db"},
     dodge=False,
@@ -253,7 +283,7 @@ sns.barplot(
 )
 
 # --- CREATE SPACE FOR LEGEND ---
-max_val = top10_maintenance['total_maintenance_ratio'].max()
+max_val = top10_maintenance['total_maintenance_ratio_eb'].max()
 ax2.set_xlim(0, max_val * 0.8)
 
 # Title and Subtitle
@@ -300,3 +330,46 @@ plt.show()
 # - Allocate equipment budgets more precisely
 # - Deploy the RIGHT type of infrastructure to each district
 # - Avoid wasteful spending on wrong equipment
+
+# %% [markdown]
+# ---
+# # Pincode-Level Update Pressure (Shrunk)
+# ---
+#
+# The same shrinkage makes pincode-level rankings usable: each pincode's
+# update-to-enrolment ratio is pulled toward its state's norm, so a pincode
+# only ranks high when its volume backs the ratio up. The lower bound of the
+# credible interval is the conservative ranking key.
+
+# %%
+pincode_pressure = pincode_df[
+    ["state", "district", "pincode", "total_enrolments", "total_updates"]
+].copy()
+
+pincode_pressure = add_shrunk_ratio(
+    pincode_pressure, "update_to_enrolment_ratio", "total_updates", "total_enrolments"
+)
+
+pincode_pressure.sort_values("update_to_enrolment_ratio_eb_lower", ascending=False).head(10)
+
+# %% [markdown]
+# ---
+# # Label Reconciliation via Pincode Prefixes
+# ---
+#
+# The first three pincode digits identify a sorting district, which sits inside
+# one state. Pincodes whose state label disagrees with the majority of their
+# prefix are mislabelled or misspelled (the same kind of dirty names patched by
+# hand above). A pincode filed under two spellings of the same district shows up
+# at the full 6-digit level.
+
+# %%
+state_conflicts = pincode_index.label_conflicts(level=3, fields=("state",))
+print(f"Pincodes whose state disagrees with their 3-digit prefix: {len(state_conflicts)}")
+state_conflicts[["pincode", "state", "district", "majority_state", "majority_share"]].head(10)
+
+# %%
+district_conflicts = pincode_index.label_conflicts(level=6, fields=("state", "district"))
+district_conflicts[
+    ["pincode", "state", "district", "majority_state", "majority_district"]
+].head(10)
@@ -17,9 +17,12 @@
 # # Age-Driven Service Pressure
 
 # %%
-from book1 import demo, bio
+from pipeline import PREVIEW_RATE, TOP_N_AGE_OUTLIERS, demo, bio
+from metrics import add_metrics
+from sampling import Z, share_se
+from shrinkage import add_shrunk_share
+from snapshots import record
 
-import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
 import seaborn as sns
@@ -47,12 +50,7 @@ district_df = demo_dist.merge(
 )
 
 # Calculate Total Activity by Age Group
-district_df["activity_5_17"] = (
-    district_df["demo_age_5_17"] + district_df["bio_age_5_17"]
-)
-district_df["activity_17_plus"] = (
-    district_df["demo_age_17_"] + district_df["bio_age_17_"]
-)
+district_df = add_metrics(district_df, ["activity_5_17", "activity_17_plus"])
 
 district_df = district_df[["state", "district", "activity_5_17", "activity_17_plus"]].copy()
 
@@ -60,34 +58,55 @@ district_df = district_df[["state", "district", "activity_5_17", "activity_17_pl
 # ## Core Metric: Age-Skew Ratio
 
 # %%
-district_df["total_update_activity"] = (
-    district_df["activity_5_17"] +
-    district_df["activity_17_plus"]
-)
-
 # Share of activity that is Adult (17+)
-district_df["age_17_plus_share"] = (
-    district_df["activity_17_plus"] /
-    district_df["total_update_activity"].replace(0, np.nan)
-)
+district_df = add_metrics(district_df, ["total_update_activity", "age_17_plus_share"])
+
+# %%
+# Preview runs only: sampling error of the share (linearized, 95% bounds)
+if PREVIEW_RATE:
+    age_share_se = share_se(
+        [(demo, "demo_age_17_", "demo_activity"), (bio, "bio_age_17_", "bio_activity")],
+        ["state", "district"],
+    )
+    district_df["age_17_plus_share_se"] = (
+        age_share_se.reindex(pd.MultiIndex.from_frame(district_df[["state", "district"]])).to_numpy()
+    )
+    district_df["age_17_plus_share_lower"] = (
+        district_df["age_17_plus_share"] - Z * district_df["age_17_plus_share_se"]
+    )
+    district_df["age_17_plus_share_upper"] = (
+        district_df["age_17_plus_share"] + Z * district_df["age_17_plus_share_se"]
+    )
+
+# %% [markdown]
+# ## Shrink Shares Toward the State Norm (Empirical Bayes)
+#
+# Instead of keeping only the top-quartile districts by volume, every
+# district's adult share is shrunk toward its state's typical share
+# (beta-binomial), in proportion to how little activity backs it. Nothing is
+# thrown away and a 90% credible interval comes with each share.
 
 # %%
-# Filter for significant volume to avoid noise
-MIN_ACTIVITY = district_df["total_update_activity"].quantile(0.75)
-filtered = district_df[district_df["total_update_activity"] >= MIN_ACTIVITY].copy()
+district_df = add_shrunk_share(
+    district_df, "age_17_plus_share", "activity_17_plus", "total_update_activity"
+)
 
 # %% [markdown]
 # ## Identify Target Zones (Adult vs Child Heavy)
 
 # %%
 # 1. Adult Heavy (High 17+ Share) -> Needs Permanent Centers
-top10_adult_heavy = filtered.sort_values("age_17_plus_share", ascending=False).head(10)
+top10_adult_heavy = district_df.sort_values("age_17_plus_share_eb", ascending=False).head(TOP_N_AGE_OUTLIERS)
 
 # 2. Child Heavy (Low 17+ Share) -> Needs School Camps
-top10_child_heavy = filtered.sort_values("age_17_plus_share", ascending=True).head(10)
+top10_child_heavy = district_df.sort_values("age_17_plus_share_eb", ascending=True).head(TOP_N_AGE_OUTLIERS)
+
+# Snapshot the full ranking for drop-to-drop diffs (only when UIDAI_DROP is set,
+# and never from a preview sample)
+record(district_df, "adult_heavy")
 
 # Calculate Median for Reference
-median_val = district_df["age_17_plus_share"].median()
+median_val = district_df["age_17_plus_share_eb"].median()
 
 # %% [markdown]
 # ## Visualization
@@ -102,7 +121,7 @@ plt.figure(figsize=[14, 7], dpi=227)
 
 # 1. The "Norm" (Boxplot)
 ax = sns.boxplot(
-    x=filtered["age_17_plus_share"],
+    x=district_df["age_17_plus_share_eb"],
     color="#f0f2f5",
     width=0.4,
     linewidth=1.2,
@@ -116,7 +135,7 @@ ax = sns.boxplot(
 # 2. The "Hotspots" (Plot ALL top 10 points with UNIQUE colors)
 sns.stripplot(
     data=top10_adult_heavy,
-    x="age_17_plus_share",
+    x="age_17_plus_share_eb",
     hue="district",
     palette="tab10",
     size=13,
@@ -137,9 +156,9 @@ for i, (idx, row) in enumerate(top10_adult_heavy.head(5).iterrows()):
     start_y = 0.15 if i % 2 == 0 else -0.15
     
     t = plt.text(
-        x=row["age_17_plus_share"],
+        x=row["age_17_plus_share_eb"],
         y=start_y, 
-        s=f"{row['district']}\n({row['age_17_plus_share']:.2f})",
+        s=f"{row['district']}\n({row['age_17_plus_share_eb']:.2f})",
         color="#2c3e50",
         fontsize=11,
         fontweight='bold',
@@ -150,7 +169,7 @@ for i, (idx, row) in enumerate(top10_adult_heavy.head(5).iterrows()):
 
 # 4. Run adjust_text
 adjust_text(texts,
-            x=top10_adult_heavy.head(5)["age_17_plus_share"],
+            x=top10_adult_heavy.head(5)["age_17_plus_share_eb"],
             y=[0] * 5, 
             force_points=0.5,
             force_text=0.6,
@@ -160,7 +179,7 @@ adjust_text(texts,
             )
 
 # 5. Contextual Lines
-median_val = filtered["age_17_plus_share"].median()
+median_val = district_df["age_17_plus_share_eb"].median()
 plt.axvline(median_val, color="#95a5a6", linestyle="--", linewidth=1.5, zorder=0)
 plt.text(median_val, 0.45, f"National Median\n({median_val:.2f})",
          color="#7f8c8d", fontsize=11, ha="center", va="bottom", backgroundcolor='white')
@@ -0,0 +1,131 @@
+"""Calendar-granularity load profiles per district.
+
+Dates are reduced to integer day ordinals (days since 1970-01-01) once, and
+the weekday, day-of-month and calendar-day slots are plain integer arithmetic
+on those ordinals. Each district x slot matrix is then a single ``bincount``
+over ``district_code * n_slots + slot``, with no groupby on datetime values, so
+the cost is linear in rows and independent of how many dates there are.
+Rows with a missing date or district key are left out, like in every other
+book1 aggregation.
+
+Compute-only: the heatmaps are rendered in book1.
+"""
+
+import numpy as np
+import pandas as pd
+
+DISTRICT_KEYS = ["state", "district"]
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+DAYS_OF_MONTH = list(range(1, 32))
+
+# Activity column of each source frame after pipeline's prepare_* step
+SOURCES = {
+    "enrol": "total_enrolments",
+    "demo": "demo_activity",
+    "bio": "bio_activity",
+}
+
+
+def day_ordinals(dates):
+    """Integer days since 1970-01-01 for a datetime64 column."""
+    return dates.to_numpy().astype("datetime64[D]").astype("int64")
+
+
+def weekday_of(ordinals):
+    # 1970-01-01 was a Thursday (Mon = 0)
+    return (ordinals + 3) % 7
+
+
+def day_of_month_of(ordinals):
+    days = ordinals.astype("datetime64[D]")
+    return (days - days.astype("datetime64[M]")).astype("int64")  # 0-based
+
+
+def _district_codes(df):
+    """Dense district code per row (-1 where a key is missing) and the index."""
+    codes = df.groupby(DISTRICT_KEYS, sort=True).ngroup().fillna(-1).to_numpy(dtype="int64")
+    first = np.unique(codes, return_index=True)[1]
+    index = pd.MultiIndex.from_frame(df[DISTRICT_KEYS].iloc[first[codes[first] >= 0]])
+    return codes, index
+
+
+def _matrix(codes, slots, weights, n_rows, n_slots):
+    flat = np.bincount(codes * n_slots + slots, weights=weights, minlength=n_rows * n_slots)
+    return flat.reshape(n_rows, n_slots)
+
+
+def profile_source(df, value, first_day=None, last_day=None):
+    """District x weekday, x day-of-month and x calendar-day sums of ``value``.
+
+    ``first_day`` / ``last_day`` (day ordinals) fix the span of the daily
+    matrix so several sources share the same columns.
+    """
+    codes, index = _district_codes(df)
+    ordinals = day_ordinals(df["date"])
+    weights = df[value].to_numpy(dtype="float64")
+    n = len(index)
+
+    # NaT becomes INT64_MIN and a missing key code -1: keep them out of bincount
+    valid = (codes >= 0) & df["date"].notna().to_numpy()
+    codes, ordinals, weights = codes[valid], ordinals[valid], weights[valid]
+
+    if first_day is None:
+        first_day = ordinals.min()
+    if last_day is None:
+        last_day = ordinals.max()
+    n_days = int(last_day - first_day + 1)
+
+    daily_columns = pd.to_datetime(np.arange(first_day, last_day + 1).astype("datetime64[D]"))
+    return {
+        "weekday": pd.DataFrame(
+            _matrix(codes, weekday_of(ordinals), weights, n, 7),
+            index=index, columns=WEEKDAYS
+        ),
+        "day_of_month": pd.DataFrame(
+            _matrix(codes, day_of_month_of(ordinals), weights, n, 31),
+            index=index, columns=DAYS_OF_MONTH
+        ),
+        "daily": pd.DataFrame(
+            _matrix(codes, ordinals - first_day, weights, n, n_days),
+            index=index, columns=daily_columns
+        ),
+    }
+
+
+def build_calendar_profiles(enrol, demo, bio):
+    """Calendar profiles for each source plus their ``total``.
+
+    Returns ``{source: {"weekday" | "day_of_month" | "daily": DataFrame}}``
+    for ``enrol``, ``demo``, ``bio`` and ``total``. Rows are
+    (state, district), aligned across sources.
+    """
+    frames = {"enrol": enrol, "demo": demo, "bio": bio}
+    ordinals = [day_ordinals(d) for d in (f["date"].dropna() for f in frames.values()) if len(d)]
+    first_day = min(o.min() for o in ordinals)
+    last_day = max(o.max() for o in ordinals)
+
+    profiles = {
+        name: profile_source(frames[name], value, first_day, last_day)
+        for name, value in SOURCES.items()
+    }
+
+    districts = profiles["enrol"]["weekday"].index
+    for name in ("demo", "bio"):
+        districts = districts.union(profiles[name]["weekday"].index)
+
+    for name in SOURCES:
+        for kind, matrix in profiles[name].items():
+            profiles[name][kind] = matrix.reindex(districts, fill_value=0.0)
+
+    profiles["total"] = {
+        kind: sum(profiles[name][kind] for name in SOURCES)
+        for kind in profiles["enrol"]
+    }
+    return profiles
+
+
+def normalize_rows(matrix):
+    """Each district's profile as shares of its own total (rows sum to 1)."""
+    totals = matrix.sum(axis=1).replace(0, np.nan)
+    return matrix.div(totals, axis=0)
@@ -0,0 +1,276 @@
+"""Hash-based deduplication of raw rows across slices and runs.
+
+Every raw row gets a 64-bit hash over all of its columns (date, state,
+district, pincode and the counts) with ``pd.util.hash_pandas_object``. The
+hashes live in a persistent store on disk (one per source), split by their
+top bits into partition files. Each file holds a sorted ``uint64`` hash array
+plus the slice that first contributed each hash and the row's position in
+that slice. Ingesting a slice:
+
+- drops rows whose hash is already owned by a *different* slice (overlapping
+  ranges, re-exports under another name);
+- drops rows repeated inside the slice: only the owning position is kept,
+  whether the slice is read whole or in chunks;
+- keeps every other row, so re-running on unchanged files drops nothing;
+- records the new hashes under this slice.
+
+The store only ever describes the data being read. Slices are registered with
+a version (a digest of the file contents), and a slice coming back with a new
+version, e.g. a refreshed export under the same file name, first releases
+every hash its old version owned. ``retain(names)`` releases slices that are
+no longer part of the read set, so rows are only dropped in favour of an
+identical row that is kept.
+
+Only one partition is in memory at a time, so memory stays bounded while the
+store grows to tens of millions of rows. Several processes (e.g. two notebook
+kernels) can share a store: every read-modify-write runs under an exclusive
+lock on the store directory, and files are replaced atomically.
+"""
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:         # Windows: no locking, one process per store
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+PARTITION_BITS = 8          # 256 partition files
+_REGISTRY = "slices.json"
+_LOCK = ".lock"
+
+
+def row_hashes(df):
+    """64-bit hash per row over all columns; numeric columns hashed as float64.
+
+    Normalizing numerics means a slice parsed with ints and one parsed with
+    floats (because of a missing value elsewhere) hash identical rows alike.
+    """
+    normalized = df.astype({
+        c: "float64" for c in df.columns if pd.api.types.is_numeric_dtype(df[c])
+    })
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy(dtype=np.uint64)
+
+
+def file_version(path, block_size=1 << 20):
+    """Digest of a file's contents, used as the version of the slice it holds."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class HashStore:
+    """Partitioned on-disk set of row hashes with the owning slice of each.
+
+    ``slices`` maps a slice name to ``{"id": ..., "version": ...}``.
+    """
+
+    def __init__(self, directory, partition_bits=PARTITION_BITS):
+        self.directory = directory
+        self.partition_bits = partition_bits
+        os.makedirs(directory, exist_ok=True)
+        self._registry_path = os.path.join(directory, _REGISTRY)
+        self._lock_path = os.path.join(directory, _LOCK)
+        self._read_registry()
+
+    @contextlib.contextmanager
+    def _locked(self):
+        """Hold the store lock and work on a fresh copy of the registry."""
+        with open(self._lock_path, "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self._read_registry()
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    # Slice registry
+
+    def _read_registry(self):
+        if os.path.exists(self._registry_path):
+            with open(self._registry_path) as f:
+                self.slices = {
+                    # Stores written before slices were versioned hold bare ids
+                    name: entry if isinstance(entry, dict) else {"id": entry, "version": None}
+                    for name, entry in json.load(f).items()
+                }
+        else:
+            self.slices = {}
+
+    def _write_registry(self):
+        _atomic_write(self._registry_path, lambda f: f.write(json.dumps(self.slices, indent=1)), "w")
+
+    def open_slice(self, name, version=None):
+        """Id of slice ``name`` at ``version``.
+
+        A version different from the registered one releases the rows of the
+        old version first, so they no longer count as seen.
+        """
+        with self._locked():
+            return self._open_slice(name, version)
+
+    def _open_slice(self, name, version):
+        entry = self.slices.get(name)
+        if entry is not None and entry["version"] == version:
+            return entry["id"]
+        if entry is not None:
+            self._release({entry["id"]})
+            sid = entry["id"]
+        else:
+            sid = max((e["id"] for e in self.slices.values()), default=-1) + 1
+        self.slices[name] = {"id": sid, "version": version}
+        self._write_registry()
+        return sid
+
+    def retain(self, names):
+        """Release every slice not in ``names`` (it is no longer being read)."""
+        names = set(names)
+        with self._locked():
+            self._retain(names)
+
+    def _retain(self, names):
+        stale = {name: entry["id"] for name, entry in self.slices.items() if name not in names}
+        if stale:
+            self._release(set(stale.values()))
+            for name in stale:
+                del self.slices[name]
+            self._write_registry()
+
+    # Partitions
+
+    def _path(self, partition):
+        return os.path.join(self.directory, f"part-{partition:04d}.npz")
+
+    def _load(self, partition):
+        path = self._path(partition)
+        if not os.path.exists(path):
+            return (
+                np.empty(0, dtype=np.uint64),
+                np.empty(0, dtype=np.uint32),
+                np.empty(0, dtype=np.int64),
+            )
+        with np.load(path) as data:
+            return data["hashes"], data["owners"], data["positions"]
+
+    def _save(self, partition, hashes, owners, positions):
+        _atomic_write(
+            self._path(partition),
+            lambda f: np.savez(f, hashes=hashes, owners=owners, positions=positions),
+            "wb",
+        )
+
+    def __len__(self):
+        with self._locked():
+            return sum(len(self._load(p)[0]) for p in range(1 << self.partition_bits))
+
+    def _release(self, ids):
+        """Drop every hash owned by a slice in ``ids``, one partition at a time."""
+        ids = np.fromiter(ids, dtype=np.uint32)
+        for p in range(1 << self.partition_bits):
+            if not os.path.exists(self._path(p)):
+                continue
+            hashes, owners, positions = self._load(p)
+            keep = ~np.isin(owners, ids)
+            if not keep.all():
+                self._save(p, hashes[keep], owners[keep], positions[keep])
+
+    # Ingest
+
+    def claim(self, hashes, name, offset=0, version=None):
+        """Record ``hashes`` for slice ``name``; returns the keep mask and counts.
+
+        ``offset`` is the position of ``hashes[0]`` in the slice, for callers
+        reading a slice in chunks. ``version`` identifies the slice contents
+        (see ``open_slice``).
+        """
+        with self._locked():
+            return self._claim(hashes, name, offset, version)
+
+    def _claim(self, hashes, name, offset, version):
+        sid = self._open_slice(name, version)
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        positions = offset + np.arange(len(hashes), dtype=np.int64)
+
+        keep = np.zeros(len(hashes), dtype=bool)
+        keep[np.unique(hashes, return_index=True)[1]] = True
+        within = int(len(hashes) - keep.sum())
+
+        partitions = (hashes >> np.uint64(64 - self.partition_bits)).astype(np.int64)
+        order = np.argsort(partitions, kind="stable")
+        bounds = np.searchsorted(partitions[order], np.arange((1 << self.partition_bits) + 1))
+
+        across = 0
+        for p in np.unique(partitions):
+            rows = order[bounds[p]:bounds[p + 1]]
+            rows = rows[keep[rows]]
+            h = hashes[rows]
+
+            stored, owners, stored_positions = self._load(p)
+            pos = np.searchsorted(stored, h)
+            found = pos < len(stored)
+            found[found] = stored[pos[found]] == h[found]
+
+            other = np.zeros(len(h), dtype=bool)
+            other[found] = owners[pos[found]] != sid
+            repeat = np.zeros(len(h), dtype=bool)
+            repeat[found] = ~other[found] & (stored_positions[pos[found]] != positions[rows[found]])
+            keep[rows[other | repeat]] = False
+            across += int(other.sum())
+            within += int(repeat.sum())
+
+            new = ~found
+            if new.any():
+                merged = np.concatenate([stored, h[new]])
+                resort = np.argsort(merged, kind="stable")
+                self._save(
+                    p,
+                    merged[resort],
+                    np.concatenate([owners, np.full(int(new.sum()), sid, dtype=np.uint32)])[resort],
+                    np.concatenate([stored_positions, positions[rows[new]]])[resort],
+                )
+
+        return keep, {
+            "slice": name,
+            "rows": len(hashes),
+            "dropped_within_slice": within,
+            "dropped_seen_in_other_slice": across,
+            "kept": int(keep.sum()),
+        }
+
+    def deduplicate(self, df, name, offset=0, version=None):
+        """``df`` without rows already seen; returns ``(frame, report_row)``."""
+        keep, report = self.claim(row_hashes(df), name, offset, version)
+        return df[keep], report
+
+
+def merge_reports(reports, name):
+    """Sum the per-chunk report rows of one slice."""
+    merged = {"slice": name, "rows": 0, "dropped_within_slice": 0,
+              "dropped_seen_in_other_slice": 0, "kept": 0}
+    for report in reports:
+        for key in merged.keys() - {"slice"}:
+            merged[key] += report[key]
+    return merged
+
+
+def _atomic_write(path, write, mode):
+    fd, tmp = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=f"{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
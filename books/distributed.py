@@ -0,0 +1,238 @@
+"""Key-partitioned execution of the book1 pipeline across workers.
+
+Rows are hash-partitioned by state (or by state + district) while the raw CSV
+slices are read, and each partition is streamed to a dedicated worker. Every
+aggregate book1 builds (``monthly_load``, ``consistency_metrics``,
+``pincode_df``, ``district_df``) is grouped by at least state and district, so
+a worker owns its keys outright and computes its slice end to end. The
+coordinator only concatenates disjoint slices; there is no cross-worker merge.
+(With district partitioning the state-level concentration columns of
+``district_df`` are the exception and are recomputed from the combined
+``pincode_df``.)
+
+Workers talk over ``multiprocessing.connection`` sockets, so the same protocol
+serves local processes (``run_partitioned(n_workers=4)``) and remote hosts
+(``run_partitioned(addresses=[("10.0.0.5", 6000), ...])``). Messages are
+pickled, so anyone holding the authkey can run code on a worker: the key is
+never built in. Local workers get a random key per run. Remote workers and
+their coordinator share one through ``UIDAI_WORKER_AUTHKEY`` (or
+``--authkey``). Start a remote worker from the ``books/`` directory, bound to
+a trusted interface only, with:
+
+    UIDAI_WORKER_AUTHKEY=... python distributed.py serve --host 10.0.0.5 --port 6000
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+from multiprocessing.connection import Client, Listener
+
+import pandas as pd
+
+from dedup import file_version, merge_reports
+from pipeline import (
+    ENROL_PATHS, DEMO_PATHS, BIO_PATHS, PIN_KEYS, DISTRICT_KEYS, _PREPARE,
+    dedup_store, record_dedup,
+    build_monthly_load, build_consistency_metrics,
+    build_pincode_df, build_district_df, add_state_concentration,
+)
+
+AUTHKEY_ENV = "UIDAI_WORKER_AUTHKEY"
+CHUNKSIZE = 250_000
+
+PARTITION_KEYS = {
+    "state": ["state"],
+    "district": DISTRICT_KEYS,
+}
+
+# Output tables and the keys they are sorted by once slices are concatenated.
+_OUTPUT_KEYS = {
+    "monthly_load": PIN_KEYS + ["month"],
+    "consistency_metrics": PIN_KEYS,
+    "pincode_df": PIN_KEYS,
+    "district_df": DISTRICT_KEYS,
+}
+
+
+def resolve_authkey(authkey=None):
+    """``authkey`` as bytes, else ``$UIDAI_WORKER_AUTHKEY``; there is no default."""
+    if authkey is None:
+        authkey = os.environ.get(AUTHKEY_ENV)
+    if not authkey:
+        raise ValueError(f"No worker authkey: pass one or set {AUTHKEY_ENV}")
+    return authkey.encode() if isinstance(authkey, str) else authkey
+
+
+# %% Partitioning
+
+def partition_ids(df, n_partitions, by="state"):
+    """Stable partition id per row, identical across processes and hosts."""
+    hashes = pd.util.hash_pandas_object(df[PARTITION_KEYS[by]], index=False)
+    return (hashes.to_numpy() % n_partitions).astype("int64")
+
+
+# %% Worker side
+
+def compute_slice(frames):
+    """Run book1's aggregation on one worker's raw rows."""
+    enrol = _PREPARE["enrol"](frames["enrol"])
+    demo = _PREPARE["demo"](frames["demo"])
+    bio = _PREPARE["bio"](frames["bio"])
+
+    monthly_load = build_monthly_load(demo, bio)
+    consistency_metrics = build_consistency_metrics(monthly_load)
+    pincode_df = build_pincode_df(enrol, demo, bio, consistency_metrics)
+    district_df = build_district_df(pincode_df)
+
+    return {
+        "monthly_load": monthly_load,
+        "consistency_metrics": consistency_metrics,
+        "pincode_df": pincode_df,
+        "district_df": district_df,
+    }
+
+
+def serve(address, authkey=None, ready=None):
+    """Accept one coordinator connection, buffer its rows, return the slice.
+
+    ``authkey`` falls back to ``$UIDAI_WORKER_AUTHKEY`` (see ``resolve_authkey``).
+
+    Protocol (pickled tuples):
+        ("schema", kind, columns)  declare the columns of a row kind
+        ("rows", kind, frame)      append raw rows of ``kind``
+        ("compute",)               aggregate and reply with a dict of frames
+    """
+    with Listener(address, authkey=resolve_authkey(authkey)) as listener:
+        if ready is not None:
+            ready.put(listener.address)
+        with listener.accept() as conn:
+            schemas = {}
+            parts = {kind: [] for kind in _PREPARE}
+            while True:
+                msg = conn.recv()
+                if msg[0] == "schema":
+                    schemas[msg[1]] = msg[2]
+                elif msg[0] == "rows":
+                    parts[msg[1]].append(msg[2])
+                elif msg[0] == "compute":
+                    frames = {
+                        kind: (
+                            pd.concat(chunks, ignore_index=True) if chunks
+                            else pd.DataFrame(columns=schemas[kind])
+                        )
+                        for kind, chunks in parts.items()
+                    }
+                    conn.send(compute_slice(frames))
+                    return
+                else:
+                    raise ValueError(f"Unknown message: {msg[0]!r}")
+
+
+# %% Coordinator side
+
+def _spawn_local_workers(n_workers, authkey):
+    ctx = mp.get_context("spawn")
+    ready = ctx.Queue()
+    procs = []
+    for _ in range(n_workers):
+        p = ctx.Process(target=serve, args=(("localhost", 0), authkey, ready))
+        p.start()
+        procs.append(p)
+    addresses = [ready.get() for _ in procs]
+    return procs, addresses
+
+
+def run_partitioned(
+    n_workers=4,
+    by="state",
+    addresses=None,
+    authkey=None,
+    chunksize=CHUNKSIZE,
+    paths=None,
+):
+    """Stream the raw slices to key-partitioned workers and gather their outputs.
+
+    ``addresses`` is a list of ``(host, port)`` pairs for already running
+    workers; when omitted, ``n_workers`` local worker processes are spawned.
+    ``authkey`` (or ``$UIDAI_WORKER_AUTHKEY``) is required for remote workers;
+    local workers get a random one.
+    ``paths`` maps ``"enrol"``/``"demo"``/``"bio"`` to CSV lists and defaults
+    to the same slices as ``pipeline``.
+
+    Returns a dict with ``monthly_load``, ``consistency_metrics``,
+    ``pincode_df`` and ``district_df``, sorted by their keys like the
+    single-process pipeline.
+    """
+    if by not in PARTITION_KEYS:
+        raise ValueError(f"by must be one of {sorted(PARTITION_KEYS)}, got {by!r}")
+    if paths is None:
+        paths = {"enrol": ENROL_PATHS, "demo": DEMO_PATHS, "bio": BIO_PATHS}
+
+    if addresses is None and authkey is None and not os.environ.get(AUTHKEY_ENV):
+        # Local workers only need a key shared with this process
+        authkey = os.urandom(32)
+    authkey = resolve_authkey(authkey)
+
+    procs = []
+    if addresses is None:
+        procs, addresses = _spawn_local_workers(n_workers, authkey)
+    conns = [Client(tuple(addr), authkey=authkey) for addr in addresses]
+    n = len(conns)
+
+    try:
+        for kind, kind_paths in paths.items():
+            store = dedup_store(kind)
+            if store is not None:
+                store.retain(os.path.basename(p) for p in kind_paths)
+            for path in kind_paths:
+                name, offset, reports = os.path.basename(path), 0, []
+                version = file_version(path) if store is not None else None
+                for chunk in pd.read_csv(path, chunksize=chunksize):
+                    if store is not None:
+                        n_rows = len(chunk)
+                        chunk, report = store.deduplicate(chunk, name, offset, version)
+                        reports.append(report)
+                        offset += n_rows
+                    for pid, part in chunk.groupby(partition_ids(chunk, n, by)):
+                        conns[pid].send(("rows", kind, part))
+                if store is not None:
+                    record_dedup(kind, merge_reports(reports, name))
+            columns = list(pd.read_csv(kind_paths[0], nrows=0).columns)
+            for conn in conns:
+                conn.send(("schema", kind, columns))
+
+        for conn in conns:
+            conn.send(("compute",))
+        slices = [conn.recv() for conn in conns]
+    finally:
+        for conn in conns:
+            conn.close()
+        for p in procs:
+            p.join()
+
+    outputs = {
+        name: (
+            pd.concat([s[name] for s in slices], ignore_index=True)
+              .sort_values(keys, ignore_index=True)
+        )
+        for name, keys in _OUTPUT_KEYS.items()
+    }
+    if by == "district":
+        # A state spans several workers, so state-level concentration is the
+        # one figure no single worker can see in full.
+        outputs["district_df"] = add_state_concentration(
+            outputs["district_df"], outputs["pincode_df"]
+        )
+    return outputs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="book1 partition worker")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve_cmd = sub.add_parser("serve", help="run a worker and wait for a coordinator")
+    serve_cmd.add_argument("--host", default="localhost")
+    serve_cmd.add_argument("--port", type=int, default=6000)
+    serve_cmd.add_argument("--authkey", help=f"shared secret (default: ${AUTHKEY_ENV})")
+    args = parser.parse_args()
+
+    serve((args.host, args.port), authkey=args.authkey)
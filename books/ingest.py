@@ -0,0 +1,291 @@
+"""Async paginated ingestion from the Aadhaar data API.
+
+The raw CSV slices (``api_data_aadhar_enrolment_0_500000.csv`` and so on) are
+500k-row pages of an API export. ``fetch_source`` pulls those pages straight
+from the API: several pages in flight at once over one pooled HTTP session,
+with retry and exponential backoff, and every page handed to a sink as soon as
+it arrives. No intermediate CSV is written.
+
+Sinks:
+
+- ``AggregateSink`` sums each page per (pincode, date) as it arrives and
+  combines the partials once at the end, in the same shape as ``pipeline``'s
+  prepared frames, so the book1 aggregation can run on the result directly
+  (see ``load_into_pipeline``).
+- ``ParquetSink`` appends each page to one parquet file (needs ``pyarrow``).
+
+Each page is deduplicated against the source's hash store (see ``dedup.py``)
+before it reaches the sink, so rows repeated across overlapping pages are
+counted once. Every fetched page is its own slice (a shifted page cannot be
+trusted to number its rows consistently), and every fetch replaces the rows of
+the previous one.
+
+The API is addressed as ``{base_url}/{resource}?offset=..&limit=..`` with the
+resource names below; point ``base_url`` at a local mock server for testing.
+Requires ``aiohttp``.
+"""
+
+import asyncio
+import io
+import os
+import random
+import time
+
+import aiohttp
+import pandas as pd
+
+from dedup import merge_reports
+from pipeline import COUNT_COLUMNS, PIN_KEYS, _PREPARE, dedup_store, record_dedup
+
+BASE_URL = os.environ.get("UIDAI_API_URL", "http://localhost:8080")
+API_KEY = os.environ.get("UIDAI_API_KEY")
+
+RESOURCES = {
+    "enrol": "api_data_aadhar_enrolment",
+    "demo": "api_data_aadhar_demographic",
+    "bio": "api_data_aadhar_biometric",
+}
+
+PAGE_SIZE = 500_000
+MAX_IN_FLIGHT = 4
+MAX_RETRIES = 5
+BACKOFF_BASE = 0.5      # seconds, doubled on every retry
+TIMEOUT = 300           # seconds per page
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Slice name prefix of the fetched pages in each source's hash store
+API_SLICE = "api"
+
+
+class PageFetchError(RuntimeError):
+    """A page could not be fetched after all retries."""
+
+
+# %% Sinks
+
+class AggregateSink:
+    """Fold pages into per-(pincode, date) sums of the count columns.
+
+    Each page is prepared and summed per key as soon as it arrives, and only
+    that partial is kept; ``result()`` sums the partials with one final
+    groupby. Work stays linear in the number of pages, and memory holds the
+    partials, i.e. about one row per (pincode, date) key per page. (The raw
+    exports already carry about one row per key, so this does not shrink the
+    data much.)
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.partials = []
+
+    def _fold(self, frame):
+        keys = PIN_KEYS + ["date", "month"]
+        value_columns = [c for c in frame.columns if c not in keys]
+        return frame.groupby(keys, as_index=False)[value_columns].sum()
+
+    def write(self, page):
+        self.partials.append(self._fold(_PREPARE[self.kind](page)))
+
+    def result(self):
+        """The summed pages, shaped like ``pipeline``'s prepared frame."""
+        if not self.partials:
+            # No pages: an empty frame with the prepared columns
+            integer_columns = ["pincode"] + COUNT_COLUMNS[self.kind]
+            empty = pd.DataFrame(columns=["date"] + PIN_KEYS + COUNT_COLUMNS[self.kind])
+            empty = empty.astype(dict.fromkeys(integer_columns, "int64"))
+            return self._fold(_PREPARE[self.kind](empty))
+        if len(self.partials) > 1:
+            self.partials = [self._fold(pd.concat(self.partials, ignore_index=True))]
+        return self.partials[0]
+
+
+class ParquetSink:
+    """Append every page to a single parquet file as one row group."""
+
+    def __init__(self, path):
+        self.path = path
+        self.writer = None
+        self.schema = None
+
+    def write(self, page):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pandas(page, preserve_index=False)
+        if self.writer is None:
+            self.schema = table.schema
+            self.writer = pq.ParquetWriter(self.path, self.schema)
+        self.writer.write_table(table.cast(self.schema))
+
+    def result(self):
+        if self.writer is not None:
+            self.writer.close()
+        return self.path
+
+
+# %% Fetching
+
+async def _fetch_page(session, url, offset, limit, params):
+    query = {**params, "offset": offset, "limit": limit, "format": "csv"}
+    if API_KEY:
+        query.setdefault("api-key", API_KEY)
+
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            async with session.get(url, params=query) as resp:
+                if resp.status in RETRY_STATUSES:
+                    raise aiohttp.ClientResponseError(
+                        resp.request_info, resp.history, status=resp.status
+                    )
+                resp.raise_for_status()
+                body = await resp.read()
+            break
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            retryable = not isinstance(exc, aiohttp.ClientResponseError) or exc.status in RETRY_STATUSES
+            if not retryable or attempt == MAX_RETRIES:
+                raise PageFetchError(f"{url} offset={offset}: {exc}") from exc
+            delay = BACKOFF_BASE * 2 ** attempt
+            await asyncio.sleep(delay * (0.5 + random.random()))
+
+    if not body.strip():
+        return pd.DataFrame()
+    return pd.read_csv(io.BytesIO(body))
+
+
+async def fetch_source(
+    kind,
+    sink,
+    session,
+    base_url=BASE_URL,
+    page_size=PAGE_SIZE,
+    max_in_flight=MAX_IN_FLIGHT,
+    total_rows=None,
+    params=None,
+    store=None,
+):
+    """Fetch every page of one source into ``sink`` and return ``sink.result()``.
+
+    When ``total_rows`` is unknown, pages are requested in increasing offsets
+    until the first short page marks the end of the data. With a hash
+    ``store``, rows already seen are dropped from each page before the sink
+    gets it.
+    """
+    url = f"{base_url.rstrip('/')}/{RESOURCES[kind]}"
+    params = params or {}
+    sink_lock = asyncio.Lock()
+    end = total_rows
+
+    reports = []
+    if store is not None:
+        # The fetched pages are the whole source: release CSV slices and the
+        # pages of the previous fetch
+        store.retain([])
+        version = f"fetch-{time.time_ns()}"
+
+    def write(page, offset):
+        if store is not None:
+            page, report = store.deduplicate(page, f"{API_SLICE}:{offset}", version=version)
+            reports.append(report)
+        if len(page):
+            sink.write(page)
+
+    async def one_page(offset):
+        page = await _fetch_page(session, url, offset, page_size, params)
+        if len(page):
+            # Sinks and stores are not thread-safe: one page at a time, off the loop
+            async with sink_lock:
+                await asyncio.to_thread(write, page, offset)
+        return offset, len(page)
+
+    next_offset = 0
+    pending = set()
+    try:
+        while True:
+            while len(pending) < max_in_flight and (end is None or next_offset < end):
+                pending.add(asyncio.create_task(one_page(next_offset)))
+                next_offset += page_size
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                offset, n_rows = task.result()
+                if n_rows < page_size:
+                    last = offset + n_rows
+                    end = last if end is None else min(end, last)
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if store is not None:
+        record_dedup(kind, merge_reports(reports, API_SLICE))
+    return sink.result()
+
+
+async def fetch_all(
+    sinks=None,
+    base_url=BASE_URL,
+    page_size=PAGE_SIZE,
+    max_in_flight=MAX_IN_FLIGHT,
+    params=None,
+    dedup=True,
+):
+    """Fetch enrol, demo and bio concurrently over one pooled session.
+
+    ``sinks`` maps source kind to a sink and defaults to an ``AggregateSink``
+    per source. ``max_in_flight`` bounds requests per source, and the shared
+    connection pool is sized for all sources together. With ``dedup`` (and
+    ``pipeline.DEDUP_DIR`` set), pages go through each source's hash store.
+    Returns ``{kind: sink.result()}``.
+    """
+    if sinks is None:
+        sinks = {kind: AggregateSink(kind) for kind in RESOURCES}
+
+    connector = aiohttp.TCPConnector(limit=max_in_flight * len(sinks))
+    timeout = aiohttp.ClientTimeout(total=TIMEOUT)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        results = await asyncio.gather(*(
+            fetch_source(
+                kind, sink, session, base_url, page_size, max_in_flight, params=params,
+                store=dedup_store(kind) if dedup else None,
+            )
+            for kind, sink in sinks.items()
+        ))
+    return dict(zip(sinks, results))
+
+
+def load_into_pipeline(**kwargs):
+    """Fetch all sources and install them as ``pipeline.enrol`` / ``demo`` / ``bio``.
+
+    Every downstream product (``pincode_df``, ``district_df``, ...) is then
+    built from the fetched data on first access. Must run before those
+    products are first used.
+    """
+    import pipeline
+
+    frames = asyncio.run(fetch_all(**kwargs))
+    for kind, frame in frames.items():
+        setattr(pipeline, kind, frame)
+    return frames
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fetch the Aadhaar API sources to parquet")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--out-dir", default="data/parquet")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT)
+    args = parser.parse_args()
+
+    sinks = {
+        kind: ParquetSink(os.path.join(args.out_dir, f"{kind}_raw.parquet"))
+        for kind in RESOURCES
+    }
+    written = asyncio.run(fetch_all(
+        sinks, base_url=args.base_url, page_size=args.page_size,
+        max_in_flight=args.max_in_flight,
+    ))
+    for kind, path in written.items():
+        print(f"{kind}: {path}")
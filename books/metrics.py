@@ -0,0 +1,182 @@
+"""Registry of derived metrics, declared once and evaluated at any level.
+
+Each metric is an arithmetic expression over base count columns or other
+metrics, e.g. ``"total_updates / total_enrolments"``. ``add_metrics(df)``
+evaluates every registered metric whose inputs are present in ``df``, so the
+same declarations serve raw rows, pincodes, districts, states and months. A
+metric added here shows up everywhere with no extra code.
+
+Evaluation walks the expression tree with NumPy ufuncs writing in place into
+temporaries the evaluation owns. Each metric allocates only its own result
+array: no ``.replace(0, np.nan)`` copies and no intermediate Series. Division
+by zero yields NaN, matching the notebooks' ``x / y.replace(0, np.nan)``.
+"""
+
+import ast
+
+import numpy as np
+
+# name -> (expression, parsed tree, input names)
+METRICS = {}
+
+
+def register(name, expression):
+    """Declare (or redefine) the metric ``name`` as ``expression``."""
+    tree = ast.parse(expression, mode="eval").body
+    inputs = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name):
+            inputs.add(node.id)
+        elif not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Unsupported syntax in metric {name!r}: {ast.dump(node)}")
+    METRICS[name] = (expression, tree, inputs)
+
+
+_BINOPS = {
+    ast.Add: np.add,
+    ast.Sub: np.subtract,
+    ast.Mult: np.multiply,
+    ast.Div: np.true_divide,
+}
+
+_ALLOWED_NODES = (
+    ast.BinOp, ast.UnaryOp, ast.USub, ast.Constant, ast.Name, ast.Load,
+    *_BINOPS,
+)
+
+
+# %% Registered metrics
+
+# Row-level base counts
+register("total_enrolments", "age_0_5 + age_5_17 + age_18_greater")
+register("demo_activity", "demo_age_5_17 + demo_age_17_")
+register("bio_activity", "bio_age_5_17 + bio_age_17_")
+
+# Operational load (book1)
+register("total_activity", "total_enrolments + demo_activity + bio_activity")
+register("activity_per_enrolment", "total_activity / total_enrolments")
+
+# Update pressure (book2)
+register("total_updates", "demo_activity + bio_activity")
+register("update_to_enrolment_ratio", "total_updates / total_enrolments")
+register("bio_to_enrol_ratio", "bio_activity / total_enrolments")
+register("demo_to_enrol_ratio", "demo_activity / total_enrolments")
+register("total_maintenance_ratio", "bio_to_enrol_ratio + demo_to_enrol_ratio")
+
+# Age mix (book3)
+register("activity_5_17", "demo_age_5_17 + bio_age_5_17")
+register("activity_17_plus", "demo_age_17_ + bio_age_17_")
+register("total_update_activity", "activity_5_17 + activity_17_plus")
+register("age_17_plus_share", "activity_17_plus / total_update_activity")
+
+
+# %% Planning
+
+def _plan(columns, names=None):
+    """Metrics to compute, in dependency order."""
+    available = set(columns)
+    plan = []
+
+    if names is None:
+        # Every metric that is missing and computable from what is present
+        progress = True
+        while progress:
+            progress = False
+            for name, (_, _, inputs) in METRICS.items():
+                if name not in available and inputs <= available:
+                    plan.append(name)
+                    available.add(name)
+                    progress = True
+        return plan
+
+    def visit(name, stack=()):
+        if name in stack:
+            raise ValueError(f"Circular metric definition: {' -> '.join(stack + (name,))}")
+        if name in plan:
+            return
+        for dep in sorted(METRICS[name][2]):
+            if dep not in available:
+                if dep not in METRICS:
+                    raise KeyError(f"Metric {name!r} needs column {dep!r}")
+                visit(dep, stack + (name,))
+        plan.append(name)
+        available.add(name)
+
+    for name in names:
+        if name not in METRICS:
+            raise KeyError(f"Unknown metric {name!r}")
+        visit(name)
+    return plan
+
+
+# %% Evaluation
+
+def _fits(buffer, other):
+    return np.result_type(buffer, other) == buffer.dtype
+
+
+def _eval(node, lookup):
+    """Evaluate ``node``; returns ``(value, owned)``. Owned arrays may be overwritten."""
+    if isinstance(node, ast.Name):
+        return lookup(node.id), False
+    if isinstance(node, ast.Constant):
+        return node.value, False
+    if isinstance(node, ast.UnaryOp):
+        value, owned = _eval(node.operand, lookup)
+        return np.negative(value, out=value if owned else None), True
+
+    left, left_owned = _eval(node.left, lookup)
+    right, right_owned = _eval(node.right, lookup)
+    op = _BINOPS[type(node.op)]
+
+    out = None
+    if isinstance(node.op, ast.Div):
+        # Result is float; reuse a float temporary if one is owned
+        for value, owned in ((left, left_owned), (right, right_owned)):
+            if owned and value.dtype.kind == "f" and _fits(value, np.float64):
+                out = value
+                break
+        zero = right == 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result = op(left, right, out=out)
+        if np.ndim(zero):
+            result[zero] = np.nan
+        elif zero:
+            result = np.full(np.shape(result), np.nan)
+        return result, True
+
+    if left_owned and _fits(left, right):
+        out = left
+    elif right_owned and _fits(right, left):
+        out = right
+    return op(left, right, out=out), True
+
+
+def evaluate(df, name, computed=None):
+    """Values of metric ``name`` over ``df`` as an array (inputs must be present)."""
+    computed = computed or {}
+
+    def lookup(column):
+        if column in computed:
+            return computed[column]
+        return df[column].to_numpy()
+
+    value, owned = _eval(METRICS[name][1], lookup)
+    if not owned:
+        value = np.array(value, copy=True)
+    return value
+
+
+def add_metrics(df, names=None):
+    """Add registered metrics to ``df`` in place and return it.
+
+    With ``names``, those metrics (and any missing metrics they depend on)
+    are computed, overwriting existing columns of the same name. Without,
+    every registered metric missing from ``df`` whose inputs are present is
+    added.
+    """
+    computed = {}
+    for name in _plan(df.columns, names):
+        computed[name] = evaluate(df, name, computed)
+        df[name] = computed[name]
+    return df
@@ -0,0 +1,162 @@
+"""Prefix index over pincodes for regional lookups and label reconciliation.
+
+Indian pincodes are hierarchical: the first digit is the zone, the first two
+the sub-zone and the first three the sorting district. With the pincodes of
+``pincode_df`` held in one sorted integer array, every prefix is a contiguous
+range ``[prefix * 10**k, (prefix + 1) * 10**k)``, so lookups are two binary
+searches instead of a boolean scan over the frame:
+
+    index = PincodeIndex(pincode_df)
+    index.under("560")          # all rows with pincodes 560xxx
+    index.rollup(2)             # totals per sub-zone
+    index.nearest(560300)       # closest known pincode(s) by shared prefix
+    index.label_conflicts(3)    # pincodes whose state disagrees with their prefix
+"""
+
+import numpy as np
+import pandas as pd
+
+PINCODE_DIGITS = 6
+
+PREFIX_LEVELS = {
+    1: "zone",
+    2: "sub_zone",
+    3: "sorting_district",
+}
+
+SUM_COLUMNS = ["total_enrolments", "demo_activity", "bio_activity", "total_activity"]
+
+
+def _prefix_range(prefix):
+    """``[low, high)`` pincode range of a prefix given as str or int digits."""
+    digits = str(prefix)
+    if not digits.isdigit() or not 0 < len(digits) <= PINCODE_DIGITS:
+        raise ValueError(f"Invalid pincode prefix: {prefix!r}")
+    scale = 10 ** (PINCODE_DIGITS - len(digits))
+    low = int(digits) * scale
+    return low, low + scale
+
+
+class PincodeIndex:
+    """Sorted-array index over the pincodes of a pincode-level frame."""
+
+    def __init__(self, pincode_df):
+        order = np.argsort(pincode_df["pincode"].to_numpy(), kind="stable")
+        self.frame = pincode_df.iloc[order].reset_index(drop=True)
+        self.pincodes = self.frame["pincode"].to_numpy(dtype="int64")
+
+    def __len__(self):
+        return len(self.pincodes)
+
+    # Lookups
+
+    def span(self, prefix):
+        """Row positions ``[start, stop)`` of the pincodes under ``prefix``."""
+        low, high = _prefix_range(prefix)
+        return (
+            int(np.searchsorted(self.pincodes, low, side="left")),
+            int(np.searchsorted(self.pincodes, high, side="left")),
+        )
+
+    def under(self, prefix):
+        """All rows whose pincode starts with ``prefix``."""
+        start, stop = self.span(prefix)
+        return self.frame.iloc[start:stop]
+
+    def count(self, prefix):
+        start, stop = self.span(prefix)
+        return stop - start
+
+    def nearest(self, pincode):
+        """Rows of the known pincode(s) sharing the longest prefix with ``pincode``.
+
+        Exact matches are returned as is. Otherwise the neighbours on both
+        sides of the insertion point are compared, and ties on prefix length
+        go to the numerically closer one.
+        """
+        target = int(pincode)
+        pos = int(np.searchsorted(self.pincodes, target))
+        if pos < len(self) and self.pincodes[pos] == target:
+            return self.frame.iloc[pos:int(np.searchsorted(self.pincodes, target, side="right"))]
+
+        candidates = [p for p in (pos - 1, pos) if 0 <= p < len(self)]
+        if not candidates:
+            return self.frame.iloc[0:0]
+
+        def key(p):
+            return (-_shared_digits(self.pincodes[p], target), abs(int(self.pincodes[p]) - target))
+
+        best = self.pincodes[min(candidates, key=key)]
+        return self.frame.iloc[
+            int(np.searchsorted(self.pincodes, best, side="left")):
+            int(np.searchsorted(self.pincodes, best, side="right"))
+        ]
+
+    # Region rollups
+
+    def prefixes(self, level):
+        return self.pincodes // 10 ** (PINCODE_DIGITS - level)
+
+    def rollup(self, level, columns=None):
+        """Per-prefix sums at ``level`` digits (1 zone, 2 sub-zone, 3 sorting district).
+
+        The index is sorted by pincode and therefore by prefix, so each region
+        is a contiguous block and the sums are one ``reduceat``.
+        """
+        columns = [c for c in (columns or SUM_COLUMNS) if c in self.frame]
+        if not len(self):
+            return pd.DataFrame(columns=["prefix", "n_pincodes"] + columns)
+
+        prefixes = self.prefixes(level)
+        starts = np.flatnonzero(np.r_[True, prefixes[1:] != prefixes[:-1]])
+        rolled = pd.DataFrame({
+            "prefix": prefixes[starts],
+            "n_pincodes": np.diff(np.r_[starts, len(prefixes)]),
+        })
+        values = self.frame[columns].to_numpy(dtype="float64")
+        rolled[columns] = np.add.reduceat(values, starts, axis=0)
+        return rolled.rename(columns={"prefix": PREFIX_LEVELS.get(level, f"prefix_{level}")})
+
+    # Label reconciliation
+
+    def label_conflicts(self, level=3, fields=("state",)):
+        """Rows whose ``fields`` labels differ from the majority of their prefix.
+
+        The majority is taken over the pincodes sharing the first ``level``
+        digits. Use ``level=3`` with ``fields=("state",)`` to catch
+        mislabelled states, and ``level=6`` with ``("state", "district")`` to
+        catch one pincode filed under several spellings of a district. Returns
+        the conflicting rows with ``majority_*`` labels and the majority's
+        share of the prefix.
+        """
+        fields = list(fields)
+        labelled = self.frame[["pincode"] + fields].assign(prefix=self.prefixes(level))
+
+        counts = labelled.groupby(["prefix"] + fields, sort=False).size().rename("n").reset_index()
+        prefix_totals = counts.groupby("prefix")["n"].transform("sum")
+        counts["majority_share"] = counts["n"] / prefix_totals
+        majority = (
+            counts.sort_values(["prefix", "n"], ascending=[True, False])
+                  .drop_duplicates("prefix")
+                  .drop(columns="n")
+                  .rename(columns={f: f"majority_{f}" for f in fields})
+        )
+
+        merged = labelled.merge(majority, on="prefix", how="left")
+        disagree = np.zeros(len(merged), dtype=bool)
+        for f in fields:
+            disagree |= merged[f].to_numpy() != merged[f"majority_{f}"].to_numpy()
+
+        conflicts = self.frame[disagree].copy()
+        for f in fields:
+            conflicts[f"majority_{f}"] = merged.loc[disagree, f"majority_{f}"].to_numpy()
+        conflicts["majority_share"] = merged.loc[disagree, "majority_share"].to_numpy()
+        return conflicts
+
+
+def _shared_digits(a, b):
+    a, b = f"{int(a):0{PINCODE_DIGITS}d}", f"{int(b):0{PINCODE_DIGITS}d}"
+    n = 0
+    while n < PINCODE_DIGITS and a[n] == b[n]:
+        n += 1
+    return n
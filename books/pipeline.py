@@ -0,0 +1,426 @@
+"""Compute-only version of the book1 pipeline.
+
+Importing this module never touches matplotlib, seaborn or adjustText. The
+data products of book1 are exposed as lazily computed module attributes, so
+
+    from pipeline import pincode_df
+
+loads the raw CSVs and builds only what ``pincode_df`` needs, on first access.
+Every product is cached after it is built.
+
+Run from the ``books/`` directory so the relative data paths resolve.
+
+Preview mode: set ``UIDAI_PREVIEW_RATE`` (e.g. ``0.05``) in the environment,
+or ``pipeline.PREVIEW_RATE`` before the first data access, to run everything
+on a stratified sample of the raw rows. Sums are scaled back up, and
+``pincode_df`` / ``district_df`` gain ``*_se`` standard-error columns (see
+``sampling.py``).
+
+Deduplication: each raw slice is checked against a persistent hash store per
+source in ``UIDAI_DEDUP_DIR`` (default ``data/dedup/<UIDAI_DROP>``, or
+``data/dedup/default`` without a drop label; empty disables it), and rows
+already seen in another slice are dropped before anything is aggregated.
+``dedup_report()`` lists the rows dropped per slice (see ``dedup.py``).
+"""
+
+import os
+
+import pandas as pd
+import numpy as np
+
+from metrics import add_metrics, evaluate
+
+# %% Paths
+
+ENROL_PATHS = [
+    'data/raw/api_data_aadhar_enrolment/api_data_aadhar_enrolment_0_500000.csv',
+    'data/raw/api_data_aadhar_enrolment/api_data_aadhar_enrolment_500000_1000000.csv',
+    'data/raw/api_data_aadhar_enrolment/api_data_aadhar_enrolment_1000000_1006029.csv',
+]
+
+DEMO_PATHS = [
+    'data/raw/api_data_aadhar_demographic/api_data_aadhar_demographic_0_500000.csv',
+    'data/raw/api_data_aadhar_demographic/api_data_aadhar_demographic_500000_1000000.csv',
+    'data/raw/api_data_aadhar_demographic/api_data_aadhar_demographic_1000000_1500000.csv',
+    'data/raw/api_data_aadhar_demographic/api_data_aadhar_demographic_1500000_2000000.csv',
+    'data/raw/api_data_aadhar_demographic/api_data_aadhar_demographic_2000000_2071700.csv',
+]
+
+BIO_PATHS = [
+    'data/raw/api_data_aadhar_biometric/api_data_aadhar_biometric_0_500000.csv',
+    'data/raw/api_data_aadhar_biometric/api_data_aadhar_biometric_500000_1000000.csv',
+    'data/raw/api_data_aadhar_biometric/api_data_aadhar_biometric_1000000_1500000.csv',
+    'data/raw/api_data_aadhar_biometric/api_data_aadhar_biometric_1500000_1861108.csv',
+]
+
+PATHS = {
+    "enrol": ENROL_PATHS,
+    "demo": DEMO_PATHS,
+    "bio": BIO_PATHS,
+}
+
+# Raw count columns of each source, scaled up in preview runs
+COUNT_COLUMNS = {
+    "enrol": ["age_0_5", "age_5_17", "age_18_greater"],
+    "demo": ["demo_age_5_17", "demo_age_17_"],
+    "bio": ["bio_age_5_17", "bio_age_17_"],
+}
+
+PREVIEW_RATE = float(os.environ.get("UIDAI_PREVIEW_RATE") or 0) or None
+PREVIEW_SEED = 0
+
+DEDUP_DIR = os.environ.get(
+    "UIDAI_DEDUP_DIR", os.path.join("data", "dedup", os.environ.get("UIDAI_DROP") or "default")
+)
+
+PIN_KEYS = ["state", "district", "pincode"]
+DISTRICT_KEYS = ["state", "district"]
+
+TOP_K_PINCODES = 3
+
+HOTSPOT_QUANTILE = 0.90
+TOP_N_DISTRICTS = 10
+GRAVITY_SHARE = 0.10
+
+# book2 / book3 selections (also what snapshots.py records)
+MAINTENANCE_QUANTILE = 0.90
+TOP_N_AGE_OUTLIERS = 10
+
+
+# %% Load, date processing & feature engineering
+
+def read_slices(paths, kind=None):
+    """Read a list of CSV slices and concatenate them.
+
+    With ``kind`` (and ``DEDUP_DIR`` set), each slice is deduplicated against
+    the other slices of that source in its hash store first. Slices not in
+    ``paths`` are released from the store.
+    """
+    store = dedup_store(kind) if kind else None
+    if store is None:
+        return pd.concat([pd.read_csv(p) for p in paths], ignore_index=True)
+
+    from dedup import file_version
+    store.retain(os.path.basename(p) for p in paths)
+    frames = []
+    for p in paths:
+        frame, report = store.deduplicate(
+            pd.read_csv(p), os.path.basename(p), version=file_version(p)
+        )
+        record_dedup(kind, report)
+        frames.append(frame)
+    return pd.concat(frames, ignore_index=True)
+
+
+def dedup_store(kind):
+    """The hash store of source ``kind``, or None when deduplication is off."""
+    if not DEDUP_DIR:
+        return None
+    from dedup import HashStore
+    return HashStore(os.path.join(DEDUP_DIR, kind))
+
+
+# (source, slice name) -> rows read / dropped, for the slices read in this process
+_DEDUP_REPORT = {}
+
+
+def record_dedup(kind, report):
+    _DEDUP_REPORT[kind, report["slice"]] = {"source": kind, **report}
+
+
+def dedup_report():
+    """Rows read, dropped and kept per slice read so far."""
+    return pd.DataFrame(list(_DEDUP_REPORT.values()))
+
+
+def prepare_enrol(enrol):
+    enrol['date'] = pd.to_datetime(enrol['date'], format='%d-%m-%Y')
+    enrol['month'] = enrol['date'].dt.to_period('M')
+    return add_metrics(enrol, ["total_enrolments"])
+
+
+def prepare_demo(demo):
+    demo['date'] = pd.to_datetime(demo['date'], format='%d-%m-%Y')
+    demo['month'] = demo['date'].dt.to_period('M')
+    return add_metrics(demo, ["demo_activity"])
+
+
+def prepare_bio(bio):
+    bio['date'] = pd.to_datetime(bio['date'], format='%d-%m-%Y')
+    bio['month'] = bio['date'].dt.to_period('M')
+    return add_metrics(bio, ["bio_activity"])
+
+
+_PREPARE = {
+    "enrol": prepare_enrol,
+    "demo": prepare_demo,
+    "bio": prepare_bio,
+}
+
+
+def load_source(kind):
+    """Read, (in preview mode) sample, and prepare one source: enrol, demo or bio."""
+    df = read_slices(PATHS[kind], kind)
+    if PREVIEW_RATE:
+        from sampling import stratified_sample
+        df = stratified_sample(df, PREVIEW_RATE, COUNT_COLUMNS[kind], seed=PREVIEW_SEED)
+    return _PREPARE[kind](df)
+
+
+# %% Monthly volatility (consistency check)
+
+def build_monthly_load(demo, bio):
+    monthly_demo = (
+        demo.groupby(PIN_KEYS + ['month'], as_index=False)
+            ['demo_activity'].sum()
+    )
+    monthly_bio = (
+        bio.groupby(PIN_KEYS + ['month'], as_index=False)
+           ['bio_activity'].sum()
+    )
+
+    monthly_load = monthly_demo.merge(
+        monthly_bio,
+        on=PIN_KEYS + ['month'],
+        how='outer'
+    )
+    monthly_load.fillna(0, inplace=True)
+
+    monthly_load['monthly_total'] = evaluate(monthly_load, 'total_updates')
+    return monthly_load
+
+
+def build_consistency_metrics(monthly_load):
+    consistency_metrics = (
+        monthly_load.groupby(PIN_KEYS)['monthly_total']
+                    .agg(['mean', 'std'])
+                    .reset_index()
+    )
+    consistency_metrics.rename(
+        columns={'mean': 'avg_monthly_load', 'std': 'load_volatility'},
+        inplace=True
+    )
+    consistency_metrics['load_volatility'] = consistency_metrics['load_volatility'].fillna(0)
+    return consistency_metrics
+
+
+# %% Pincode & district aggregation
+
+def build_pincode_df(enrol, demo, bio, consistency_metrics):
+    enrol_pin = enrol.groupby(PIN_KEYS, as_index=False)["total_enrolments"].sum()
+    demo_pin = demo.groupby(PIN_KEYS, as_index=False)["demo_activity"].sum()
+    bio_pin = bio.groupby(PIN_KEYS, as_index=False)["bio_activity"].sum()
+
+    pincode_df = (
+        enrol_pin
+        .merge(demo_pin, on=PIN_KEYS, how="left")
+        .merge(bio_pin, on=PIN_KEYS, how="left")
+        .merge(consistency_metrics, on=PIN_KEYS, how="left")
+    )
+    pincode_df.fillna(0, inplace=True)
+
+    # total_activity, activity_per_enrolment and every other registered metric
+    return add_metrics(pincode_df)
+
+
+def build_concentration(pincode_df, keys, top_k=TOP_K_PINCODES, value="total_activity"):
+    """Concentration of ``value`` across the pincodes of each ``keys`` group.
+
+    One segmented pass: rows are sorted by (group, value) once and every
+    metric is a ``reduceat`` over the group boundaries, so there are no
+    per-group loops or merges. Returns one row per group with
+    ``n_pincodes``, ``pincode_hhi``, ``pincode_gini``,
+    ``top{k}_pincode_share`` and ``effective_pincodes``.
+    """
+    if not len(pincode_df):
+        # No groups (e.g. a distributed worker that received no keys)
+        return pincode_df[keys].iloc[:0].reset_index(drop=True).assign(
+            n_pincodes=np.empty(0, dtype="int64"),
+            pincode_hhi=np.empty(0),
+            pincode_gini=np.empty(0),
+            **{f"top{top_k}_pincode_share": np.empty(0)},
+            effective_pincodes=np.empty(0),
+        )
+
+    codes = pincode_df.groupby(keys, sort=True).ngroup().to_numpy()
+    values = pincode_df[value].to_numpy(dtype="float64")
+
+    order = np.lexsort((values, codes))
+    codes = codes[order]
+    x = values[order]
+
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    counts = np.diff(np.r_[starts, len(x)])
+    totals = np.add.reduceat(x, starts)
+
+    # Position of each row inside its group: 1..n ascending by value
+    rank = np.arange(len(x)) - np.repeat(starts, counts) + 1
+    n = np.repeat(counts, counts)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share = x / np.repeat(totals, counts)
+        hhi = np.add.reduceat(share * share, starts)
+        gini = (
+            2 * np.add.reduceat(rank * x, starts) / (counts * totals)
+            - (counts + 1) / counts
+        )
+        top_share = np.add.reduceat(np.where(n - rank < top_k, share, 0.0), starts)
+        effective = 1 / hhi
+
+    zero = totals == 0
+    concentration = pincode_df.iloc[order[starts]][keys].reset_index(drop=True)
+    concentration["n_pincodes"] = counts
+    concentration["pincode_hhi"] = np.where(zero, np.nan, hhi)
+    concentration["pincode_gini"] = np.where(zero, np.nan, gini)
+    concentration[f"top{top_k}_pincode_share"] = np.where(zero, np.nan, top_share)
+    concentration["effective_pincodes"] = np.where(zero, np.nan, effective)
+    return concentration
+
+
+def build_district_df(pincode_df):
+    district_df = (
+        pincode_df.groupby(DISTRICT_KEYS, as_index=False)
+                  .agg({
+                      "total_enrolments": "sum",
+                      "demo_activity": "sum",
+                      "bio_activity": "sum",
+                      "avg_monthly_load": "mean",
+                      "load_volatility": "mean"
+                  })
+    )
+    district_df = add_metrics(district_df)
+
+    # Concentration of load across pincodes, within the district and the state
+    district_df = district_df.merge(
+        build_concentration(pincode_df, DISTRICT_KEYS), on=DISTRICT_KEYS, how="left"
+    )
+    return add_state_concentration(district_df, pincode_df)
+
+
+def add_state_concentration(district_df, pincode_df):
+    """Attach state-level concentration columns (``state_`` prefix) to districts."""
+    state_concentration = build_concentration(pincode_df, ["state"])
+    state_concentration = state_concentration.rename(
+        columns={c: f"state_{c}" for c in state_concentration.columns if c != "state"}
+    )
+    district_df = district_df.drop(
+        columns=[c for c in state_concentration.columns if c != "state"],
+        errors="ignore"
+    )
+    return district_df.merge(state_concentration, on="state", how="left")
+
+
+def add_sampling_errors(frame, enrol, demo, bio, keys):
+    """In preview runs, add ``*_se`` columns for the summed activity columns."""
+    if not PREVIEW_RATE:
+        return frame
+    from sampling import add_standard_errors
+    return add_standard_errors(frame, {
+        "total_enrolments": (enrol, "total_enrolments"),
+        "demo_activity": (demo, "demo_activity"),
+        "bio_activity": (bio, "bio_activity"),
+        "total_activity": ("total_enrolments", "demo_activity", "bio_activity"),
+    }, keys)
+
+
+# %% Hotspots & pincode drill-down
+
+def find_hotspots(district_df, quantile=HOTSPOT_QUANTILE):
+    threshold = district_df["total_activity"].quantile(quantile)
+    return district_df[
+        district_df["total_activity"] >= threshold
+    ].sort_values("total_activity", ascending=False)
+
+
+def find_top_districts(district_df, n=TOP_N_DISTRICTS):
+    return (
+        district_df
+        .sort_values("total_activity", ascending=False)
+        .head(n)[DISTRICT_KEYS]
+    )
+
+
+def build_pincode_top(pincode_df, top_districts):
+    pincode_top = pincode_df.merge(top_districts, on=DISTRICT_KEYS, how="inner")
+    pincode_top["district_total_activity"] = (
+        pincode_top.groupby(DISTRICT_KEYS)["total_activity"]
+                   .transform("sum")
+    )
+    pincode_top["pincode_activity_share"] = (
+        pincode_top["total_activity"] /
+        pincode_top["district_total_activity"]
+    )
+    return pincode_top
+
+
+def find_gravity_pincodes(pincode_top, min_share=GRAVITY_SHARE):
+    return pincode_top[
+        pincode_top["pincode_activity_share"] >= min_share
+    ].sort_values(
+        ["state", "district", "pincode_activity_share"],
+        ascending=False
+    )
+
+
+# %% Lazy data products
+
+# Each product is built from other products on first access. Values are cached
+# in the module namespace, so later lookups never reach ``__getattr__``.
+_PRODUCTS = {
+    "enrol": lambda: load_source("enrol"),
+    "demo": lambda: load_source("demo"),
+    "bio": lambda: load_source("bio"),
+    "monthly_load": lambda: build_monthly_load(_get("demo"), _get("bio")),
+    "consistency_metrics": lambda: build_consistency_metrics(_get("monthly_load")),
+    "pincode_df": lambda: add_sampling_errors(
+        build_pincode_df(_get("enrol"), _get("demo"), _get("bio"), _get("consistency_metrics")),
+        _get("enrol"), _get("demo"), _get("bio"), PIN_KEYS
+    ),
+    "district_df": lambda: add_sampling_errors(
+        build_district_df(_get("pincode_df")),
+        _get("enrol"), _get("demo"), _get("bio"), DISTRICT_KEYS
+    ),
+    "hotspots": lambda: find_hotspots(_get("district_df")),
+    "top10_districts": lambda: find_top_districts(_get("district_df")),
+    "pincode_top": lambda: build_pincode_top(_get("pincode_df"), _get("top10_districts")),
+    "gravity_pincodes": lambda: find_gravity_pincodes(_get("pincode_top")),
+    "calendar_profiles": lambda: _calendar_load().build_calendar_profiles(
+        _get("enrol"), _get("demo"), _get("bio")
+    ),
+    "pincode_index": lambda: _pincode_index().PincodeIndex(_get("pincode_df")),
+    "enrol_bitmaps": lambda: _bitmap_index().build_frame_index(_get("enrol")),
+    "demo_bitmaps": lambda: _bitmap_index().build_frame_index(_get("demo")),
+    "bio_bitmaps": lambda: _bitmap_index().build_frame_index(_get("bio")),
+}
+
+
+def _calendar_load():
+    import calendar_load
+    return calendar_load
+
+
+def _pincode_index():
+    import pincode_index
+    return pincode_index
+
+
+def _bitmap_index():
+    import bitmap_index
+    return bitmap_index
+
+
+def _get(name):
+    namespace = globals()
+    if name not in namespace:
+        namespace[name] = _PRODUCTS[name]()
+    return namespace[name]
+
+
+def __getattr__(name):
+    if name in _PRODUCTS:
+        return _get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_PRODUCTS))
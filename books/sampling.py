@@ -0,0 +1,135 @@
+"""Stratified sampling for fast preview runs, with error bounds.
+
+Raw rows are sampled without replacement inside each (state, district)
+stratum at a fixed rate (at least one row per stratum), and the count columns
+are scaled by ``N_h / n_h`` so every downstream sum is an unbiased
+(Horvitz-Thompson) estimate of the full-data sum. The sampled frame keeps
+``sample_weight`` (``N_h / n_h``) and ``stratum_sample_size`` (``n_h``) so
+the standard errors can be computed later for any domain: pincode, district
+or state.
+
+For a domain ``d`` and stratum ``h`` the variance of the estimated total is
+``(1 - f_h) * n_h * s_h^2`` where ``s_h^2`` is the sample variance over the
+stratum's ``n_h`` rows of the (already scaled) value restricted to ``d``.
+"""
+
+import numpy as np
+
+STRATA_KEYS = ["state", "district"]
+
+WEIGHT = "sample_weight"
+SAMPLE_SIZE = "stratum_sample_size"
+
+# 95% normal bounds
+Z = 1.96
+
+
+def stratified_sample(df, rate, count_columns, keys=STRATA_KEYS, seed=0):
+    """Sample ``rate`` of the rows of each stratum and scale ``count_columns`` up."""
+    if not 0 < rate <= 1:
+        raise ValueError(f"rate must be in (0, 1], got {rate!r}")
+
+    rng = np.random.default_rng(seed)
+    shuffled = df.iloc[rng.permutation(len(df))]
+    groups = shuffled.groupby(keys, sort=False)
+
+    stratum_size = groups[keys[0]].transform("size").to_numpy()
+    sample_size = np.maximum(np.ceil(stratum_size * rate), 1).astype("int64")
+    keep = groups.cumcount().to_numpy() < sample_size
+
+    sample = shuffled.assign(**{
+        WEIGHT: stratum_size / sample_size,
+        SAMPLE_SIZE: sample_size,
+    })[keep].sort_index()
+
+    sample = sample.astype({c: "float64" for c in count_columns})
+    sample[count_columns] = sample[count_columns].mul(sample[WEIGHT], axis=0)
+    return sample
+
+
+def total_variance(df, value, keys, strata_keys=STRATA_KEYS):
+    """Variance of the estimated total of ``value`` per ``keys`` domain.
+
+    ``value`` is a column name or a row-aligned Series of scaled values.
+    Domains may be finer than the strata (pincode) or coarser (state).
+    """
+    y = df[value] if isinstance(value, str) else value
+    cells = list(dict.fromkeys(strata_keys + keys))
+
+    frame = df[cells].assign(
+        _y=y.to_numpy(dtype="float64"),
+        _y2=y.to_numpy(dtype="float64") ** 2,
+        _n=df[SAMPLE_SIZE].to_numpy(),
+        _f=1 / df[WEIGHT].to_numpy(),
+    )
+    per_cell = frame.groupby(cells, sort=False).agg(
+        s1=("_y", "sum"), s2=("_y2", "sum"), n=("_n", "first"), f=("_f", "first")
+    )
+
+    n = per_cell["n"].to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s2 = (per_cell["s2"] - per_cell["s1"] ** 2 / n) / (n - 1)
+    variance = ((1 - per_cell["f"]) * n * s2.where(n > 1, 0.0)).clip(lower=0)
+
+    return variance.groupby(level=keys).sum()
+
+
+def add_standard_errors(target, sources, keys, strata_keys=STRATA_KEYS):
+    """Add ``{column}_se`` to ``target`` for each summed column of ``sources``.
+
+    ``sources`` maps a target column to ``(sampled_frame, row_value_column)``.
+    Columns listed as a tuple of target columns (e.g. ``total_activity`` from
+    three independently sampled sources) get the root of their summed variances.
+    """
+    variances = {}
+    for column, spec in sources.items():
+        if isinstance(spec, tuple) and isinstance(spec[0], str):
+            var = _add_all(variances[part] for part in spec)
+        else:
+            df, value = spec
+            var = total_variance(df, value, keys, strata_keys)
+        variances[column] = var
+
+    keyed = target.set_index(keys)
+    for column, var in variances.items():
+        aligned = var.reindex(keyed.index).fillna(0.0)
+        target[f"{column}_se"] = np.sqrt(aligned.to_numpy())
+    return target
+
+
+def ratio_se(numerator, numerator_se, denominator, denominator_se):
+    """Delta-method standard error of ``numerator / denominator``.
+
+    Numerator and denominator are assumed independent, which holds when they
+    come from separately sampled sources (updates vs enrolments).
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = numerator / denominator
+        return np.sqrt(numerator_se ** 2 + (ratio * denominator_se) ** 2) / np.abs(denominator)
+
+
+def share_se(parts, keys, strata_keys=STRATA_KEYS):
+    """Linearized standard error of ``sum(part) / sum(whole)`` per domain.
+
+    ``parts`` is a list of ``(sampled_frame, part_column, whole_column)`` from
+    independently sampled sources, e.g. adult vs all update activity from the
+    demo and bio frames. Returns a Series indexed by ``keys``.
+    """
+    part_total = _add_all(df.groupby(keys)[p].sum() for df, p, _ in parts)
+    whole_total = _add_all(df.groupby(keys)[w].sum() for df, _, w in parts)
+    share = (part_total / whole_total.replace(0, np.nan)).fillna(0.0)
+
+    variances = []
+    for df, p, w in parts:
+        row_share = share.reindex(df.set_index(keys).index).to_numpy()
+        residual = df[p] - row_share * df[w]
+        variances.append(total_variance(df, residual, keys, strata_keys))
+
+    return np.sqrt(_add_all(variances)) / whole_total.replace(0, np.nan)
+
+
+def _add_all(series):
+    total = None
+    for s in series:
+        total = s if total is None else total.add(s, fill_value=0)
+    return total
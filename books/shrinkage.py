@@ -0,0 +1,177 @@
+"""Empirical-Bayes shrinkage for small-volume ratios.
+
+Instead of dropping low-volume districts, every ratio is replaced by its
+posterior mean under a prior fitted (method of moments) across all units of
+the same state, the unit itself included. Small units are pulled toward their
+state's typical value and large units keep their raw ratio, and every
+estimate comes with a credible interval.
+
+- ``beta_binomial``: shares such as the adult share of update activity.
+  ``successes ~ Binomial(trials, p)``, ``p ~ Beta(alpha, beta)``.
+- ``shrunk_ratio``: ratios whose noise sits in a small denominator, such as
+  updates per enrolment. The denominator's share of all activity is shrunk
+  with ``beta_binomial`` and mapped back to a ratio.
+
+Both are a handful of ``bincount`` / array operations, with no per-group
+loops and no scipy dependency. Interval bounds use a logit-normal
+approximation of the beta posterior.
+"""
+
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+CREDIBLE_LEVEL = 0.90
+
+# States with fewer units than this borrow the national prior: their own
+# between-unit spread cannot be estimated.
+MIN_GROUP_SIZE = 3
+
+
+# %% Prior fitting
+
+def _group_codes(groups):
+    codes, uniques = pd.factorize(pd.Series(groups), sort=True)
+    return codes, len(uniques)
+
+
+def _moments(values, weights, codes, n_groups):
+    """Per-group weighted mean and variance of ``values``, plus mean weight and count."""
+    wsum = np.bincount(codes, weights=weights, minlength=n_groups)
+    count = np.bincount(codes, minlength=n_groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.bincount(codes, weights=weights * values, minlength=n_groups) / wsum
+        var = np.bincount(
+            codes, weights=weights * (values - mean[codes]) ** 2, minlength=n_groups
+        ) / wsum
+        mean_weight = wsum / count
+    return mean, var, mean_weight, count
+
+
+def _with_national(local, national, count):
+    """Replace group estimates that rest on too few units with the national one."""
+    return np.where(count >= MIN_GROUP_SIZE, local, national)
+
+
+# %% Beta-binomial (shares)
+
+def beta_binomial(successes, trials, groups, level=CREDIBLE_LEVEL):
+    """Shrunk ``successes / trials`` shares with a per-group beta prior.
+
+    Returns a DataFrame aligned with the inputs with columns ``estimate``,
+    ``lower`` and ``upper``. Units with zero trials get the prior mean.
+    """
+    k = np.asarray(successes, dtype="float64")
+    n = np.asarray(trials, dtype="float64")
+    codes, n_groups = _group_codes(groups)
+
+    observed = n > 0
+    share = np.divide(k, n, out=np.zeros_like(k), where=observed)
+    weight = np.where(observed, n, 0.0)
+
+    def fit(codes, n_groups):
+        mean, var, mean_n, count = _moments(share, weight, codes, n_groups)
+        mean = np.clip(mean, 1e-6, 1 - 1e-6)
+        binomial = mean * (1 - mean)
+        # Between-unit variance = observed spread minus binomial noise
+        tau2 = np.clip(var - binomial / mean_n, 1e-6 * binomial, binomial * (1 - 1e-6))
+        strength = binomial / tau2 - 1
+        return mean * strength, (1 - mean) * strength, count
+
+    alpha, beta, count = fit(codes, n_groups)
+    alpha0, beta0, _ = fit(np.zeros(len(k), dtype="int64"), 1)
+    alpha = _with_national(alpha, alpha0[0], count)[codes]
+    beta = _with_national(beta, beta0[0], count)[codes]
+
+    post_a = alpha + k
+    post_b = beta + (n - k)
+    lower, upper = _beta_interval(post_a, post_b, level)
+    return pd.DataFrame({
+        "estimate": post_a / (post_a + post_b), "lower": lower, "upper": upper
+    })
+
+
+def _beta_interval(a, b, level):
+    # logit(p) = log(G_a / G_b), mean digamma(a) - digamma(b),
+    # variance trigamma(a) + trigamma(b)
+    z = NormalDist().inv_cdf(0.5 + level / 2)
+    center = _digamma(a) - _digamma(b)
+    spread = z * np.sqrt(_trigamma(a) + _trigamma(b))
+    return _expit(center - spread), _expit(center + spread)
+
+
+def _expit(x):
+    return 1 / (1 + np.exp(-x))
+
+
+def _digamma(x):
+    x = np.array(x, dtype="float64")
+    acc = np.zeros_like(x)
+    # Recurrence psi(x) = psi(x + 1) - 1/x until the asymptotic series is accurate
+    for _ in range(6):
+        small = x < 6
+        acc -= np.where(small, 1 / x, 0.0)
+        x = np.where(small, x + 1, x)
+    inv2 = 1 / (x * x)
+    return acc + np.log(x) - 0.5 / x - inv2 * (1 / 12 - inv2 * (1 / 120 - inv2 / 252))
+
+
+def _trigamma(x):
+    x = np.array(x, dtype="float64")
+    acc = np.zeros_like(x)
+    for _ in range(6):
+        small = x < 6
+        acc += np.where(small, 1 / (x * x), 0.0)
+        x = np.where(small, x + 1, x)
+    inv2 = 1 / (x * x)
+    return acc + 1 / x + inv2 / 2 + inv2 / x * (1 / 6 - inv2 * (1 / 30 - inv2 / 42))
+
+
+# %% Ratios with a noisy denominator
+
+def shrunk_ratio(numerator, denominator, groups, level=CREDIBLE_LEVEL):
+    """Shrunk ``numerator / denominator`` ratios, e.g. updates per enrolment.
+
+    The counting noise that matters is in the small denominator: 3 enrolments
+    against 900 updates could as well have been 6. The denominator's share of
+    all activity, ``denominator / (numerator + denominator)``, is shrunk with
+    ``beta_binomial`` and inverted with ``r = (1 - s) / s``. The map is
+    decreasing, so the share's upper bound gives the ratio's lower bound.
+    Units with a zero denominator get NaN, like the raw ratio.
+    """
+    num = np.asarray(numerator, dtype="float64")
+    den = np.asarray(denominator, dtype="float64")
+    share = beta_binomial(den, num + den, groups, level)
+
+    def invert(s):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            r = (1 - s) / s
+        return np.where(den > 0, r, np.nan)
+
+    return pd.DataFrame({
+        "estimate": invert(share["estimate"].to_numpy()),
+        "lower": invert(share["upper"].to_numpy()),
+        "upper": invert(share["lower"].to_numpy()),
+    })
+
+
+# %% DataFrame helpers
+
+def add_shrunk_share(df, name, successes, trials, group="state", level=CREDIBLE_LEVEL):
+    """Add ``{name}_eb`` and its ``_lower`` / ``_upper`` bounds (beta-binomial)."""
+    shrunk = beta_binomial(df[successes], df[trials], df[group], level)
+    return _assign(df, name, shrunk)
+
+
+def add_shrunk_ratio(df, name, numerator, denominator, group="state", level=CREDIBLE_LEVEL):
+    """Add ``{name}_eb`` and its ``_lower`` / ``_upper`` bounds (see ``shrunk_ratio``)."""
+    shrunk = shrunk_ratio(df[numerator], df[denominator], df[group], level)
+    return _assign(df, name, shrunk)
+
+
+def _assign(df, name, shrunk):
+    df[f"{name}_eb"] = shrunk["estimate"].to_numpy()
+    df[f"{name}_eb_lower"] = shrunk["lower"].to_numpy()
+    df[f"{name}_eb_upper"] = shrunk["upper"].to_numpy()
+    return df
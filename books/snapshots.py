@@ -0,0 +1,305 @@
+"""Snapshots of the ranked outputs and diffs between data drops.
+
+Each notebook records its ranking tables when ``UIDAI_DROP`` names the current
+data drop (e.g. ``UIDAI_DROP=2025-12``). Preview runs (``UIDAI_PREVIEW_RATE``)
+are never recorded: rankings from a sample would pass for the drop's own.
+
+- ``hotspots``: book1 districts by ``total_activity``, top decile selected;
+- ``maintenance_heavy``: book2 districts by ``total_maintenance_ratio_eb``,
+  top decile selected;
+- ``adult_heavy``: book3 districts by ``age_17_plus_share_eb``, top 10 selected;
+- ``pincode_activity``: book1 pincodes by ``total_activity``, top decile.
+
+A snapshot keeps every row, not only the selected ones: keys, metric, rank
+and a ``selected`` flag, stored as one small parquet file per ranking under
+``data/snapshots/<drop>/``. The threshold goes in the drop's manifest.
+Comparing two drops:
+
+    diff_drops("2025-11", "2025-12")["hotspots"]
+    entered_left(diff_drops("2025-11", "2025-12")["hotspots"])
+    history("adult_heavy")                  # rank per drop, every drop
+
+or ``python snapshots.py diff 2025-11 2025-12`` from the ``books/``
+directory.
+
+Keys of all compared snapshots are factorized together once. Every metric and
+rank then lands in a dense array indexed by key code, so alignment is a
+scatter rather than a merge, even across many pincode-level drops.
+"""
+
+import importlib.util
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import pipeline
+from pipeline import (
+    DISTRICT_KEYS, PIN_KEYS, HOTSPOT_QUANTILE, MAINTENANCE_QUANTILE, TOP_N_AGE_OUTLIERS,
+)
+
+SNAPSHOT_DIR = os.environ.get("UIDAI_SNAPSHOT_DIR", "data/snapshots")
+DROP = os.environ.get("UIDAI_DROP") or None
+
+_MANIFEST = "manifest.json"
+
+# name -> keys, ranked metric, direction and selection rule (quantile or top_n)
+RANKINGS = {
+    "hotspots": dict(
+        keys=DISTRICT_KEYS, value="total_activity", ascending=False, quantile=HOTSPOT_QUANTILE,
+    ),
+    "maintenance_heavy": dict(
+        keys=DISTRICT_KEYS, value="total_maintenance_ratio_eb", ascending=False, quantile=MAINTENANCE_QUANTILE,
+    ),
+    "adult_heavy": dict(
+        keys=DISTRICT_KEYS, value="age_17_plus_share_eb", ascending=False, top_n=TOP_N_AGE_OUTLIERS,
+    ),
+    "pincode_activity": dict(
+        keys=PIN_KEYS, value="total_activity", ascending=False, quantile=HOTSPOT_QUANTILE,
+    ),
+}
+
+
+# %% Snapshots
+
+def build_snapshot(frame, name):
+    """Keys, metric, rank (1 = top) and ``selected`` flag for ranking ``name``.
+
+    Returns the snapshot and the selection threshold (the metric value at the
+    cut, for quantile and top-n rules alike).
+    """
+    spec = RANKINGS[name]
+    keys, value, ascending = spec["keys"], spec["value"], spec["ascending"]
+    snap = frame[keys + [value]].dropna(subset=[value]).reset_index(drop=True)
+    snap["rank"] = snap[value].rank(method="min", ascending=ascending).astype("int64")
+
+    if "top_n" in spec:
+        ordered = snap[value].sort_values(ascending=ascending)
+        threshold = float(ordered.iloc[min(spec["top_n"], len(ordered)) - 1]) if len(ordered) else np.nan
+    else:
+        q = 1 - spec["quantile"] if ascending else spec["quantile"]
+        threshold = float(snap[value].quantile(q))
+    snap["selected"] = _passes(snap[value].to_numpy(), threshold, ascending)
+    return snap.sort_values("rank", kind="stable", ignore_index=True), threshold
+
+
+def _passes(values, threshold, ascending):
+    return values <= threshold if ascending else values >= threshold
+
+
+def _manifest_path(drop):
+    return os.path.join(SNAPSHOT_DIR, str(drop), _MANIFEST)
+
+
+def _read_manifest(drop):
+    path = _manifest_path(drop)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_snapshot(frame, name, drop):
+    """Snapshot ranking ``name`` of ``frame`` under data drop ``drop``."""
+    snap, threshold = build_snapshot(frame, name)
+    directory = os.path.join(SNAPSHOT_DIR, str(drop))
+    os.makedirs(directory, exist_ok=True)
+    snap.to_parquet(os.path.join(directory, f"{name}.parquet"), index=False)
+
+    manifest = _read_manifest(drop)
+    manifest[name] = {**RANKINGS[name], "threshold": threshold, "rows": len(snap)}
+    with open(_manifest_path(drop), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return snap
+
+
+def record(frame, name):
+    """``save_snapshot`` under ``UIDAI_DROP`` when it is set; no-op otherwise.
+
+    Also a no-op in preview runs, whose rankings come from a sample.
+    """
+    if not DROP:
+        return None
+    if pipeline.PREVIEW_RATE:
+        print(f"Preview run: {name!r} not recorded under drop {DROP!r}")
+        return None
+    _require_parquet_engine()
+    return save_snapshot(frame, name, DROP)
+
+
+def _require_parquet_engine():
+    if not any(importlib.util.find_spec(m) for m in ("pyarrow", "fastparquet")):
+        raise ImportError(
+            f"UIDAI_DROP={DROP!r} records snapshots as parquet, which needs pyarrow "
+            "(pip install pyarrow); unset UIDAI_DROP to run without snapshots"
+        )
+
+
+def load_snapshot(drop, name):
+    """``(snapshot, manifest entry)`` of ranking ``name`` in ``drop``."""
+    meta = _read_manifest(drop).get(name)
+    if meta is None:
+        raise KeyError(f"No {name!r} snapshot in drop {drop!r}")
+    return pd.read_parquet(os.path.join(SNAPSHOT_DIR, str(drop), f"{name}.parquet")), meta
+
+
+def list_drops():
+    """Drops with a manifest, in sorted (chronological for ISO labels) order."""
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return []
+    return sorted(d for d in os.listdir(SNAPSHOT_DIR) if os.path.exists(_manifest_path(d)))
+
+
+# %% Key alignment
+
+def _align(frames, keys):
+    """Shared key codes for several frames plus the unique keys, in code order.
+
+    Each key column is factorized over all frames at once and the per-column
+    codes are combined as integers, so no per-row tuples are built.
+    """
+    stacked = pd.concat([f[keys] for f in frames], ignore_index=True)
+    combined = np.zeros(len(stacked), dtype=np.int64)
+    for column in keys:
+        codes, uniques = pd.factorize(stacked[column])
+        combined = combined * (len(uniques) + 1) + (codes + 1)
+    codes, uniques = pd.factorize(combined)
+    first = np.unique(codes, return_index=True)[1]
+    bounds = np.cumsum([0] + [len(f) for f in frames])
+    return [codes[a:b] for a, b in zip(bounds[:-1], bounds[1:])], stacked.iloc[first].reset_index(drop=True)
+
+
+def _scatter(n, codes, values, fill):
+    out = np.full(n, fill, dtype=np.result_type(values, type(fill)))
+    out[codes] = values
+    return out
+
+
+# %% Diffs
+
+def diff(old, new, old_meta, new_meta):
+    """Row per key of either snapshot with ranks, metric deltas and status.
+
+    ``status`` is ``entered``/``left`` when the selection changed, ``stayed``
+    or ``outside`` when it did not, and ``new``/``gone`` for keys present in
+    only one snapshot. ``crossed_by`` says what moved an entered or left key:
+    ``value`` when its metric crossed the old threshold, ``threshold`` when
+    the metric stayed on the same side and the cut moved instead.
+    """
+    keys, value, ascending = new_meta["keys"], new_meta["value"], new_meta["ascending"]
+    (old_codes, new_codes), out = _align([old, new], keys)
+    n = len(out)
+
+    in_old = _scatter(n, old_codes, np.ones(len(old), dtype=bool), False)
+    in_new = _scatter(n, new_codes, np.ones(len(new), dtype=bool), False)
+    value_old = _scatter(n, old_codes, old[value].to_numpy(dtype="float64"), np.nan)
+    value_new = _scatter(n, new_codes, new[value].to_numpy(dtype="float64"), np.nan)
+    rank_old = _scatter(n, old_codes, old["rank"].to_numpy(dtype="float64"), np.nan)
+    rank_new = _scatter(n, new_codes, new["rank"].to_numpy(dtype="float64"), np.nan)
+    sel_old = _scatter(n, old_codes, old["selected"].to_numpy(dtype=bool), False)
+    sel_new = _scatter(n, new_codes, new["selected"].to_numpy(dtype=bool), False)
+
+    out[f"{value}_old"] = value_old
+    out[f"{value}_new"] = value_new
+    out[f"{value}_delta"] = value_new - value_old
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[f"{value}_pct_change"] = np.where(value_old != 0, (value_new - value_old) / np.abs(value_old), np.nan)
+    out["rank_old"] = rank_old
+    out["rank_new"] = rank_new
+    # Positive = moved up the ranking
+    out["rank_change"] = rank_old - rank_new
+    out["selected_old"] = sel_old
+    out["selected_new"] = sel_new
+
+    out["status"] = np.select(
+        [~in_old, ~in_new, sel_new & ~sel_old, sel_old & ~sel_new, sel_new],
+        ["new", "gone", "entered", "left", "stayed"],
+        default="outside",
+    )
+
+    crossed_value = _passes(value_new, old_meta["threshold"], ascending) != _passes(
+        value_old, old_meta["threshold"], ascending
+    )
+    changed = in_old & in_new & (sel_old != sel_new)
+    out["crossed_by"] = np.where(changed, np.where(crossed_value, "value", "threshold"), "")
+
+    order = np.lexsort((np.nan_to_num(rank_old, nan=np.inf), np.nan_to_num(rank_new, nan=np.inf)))
+    return out.iloc[order].reset_index(drop=True)
+
+
+def entered_left(changes):
+    """Only the keys whose selection changed (``entered``/``left``, plus
+    selected keys that are ``new`` or ``gone``)."""
+    moved = changes["status"].isin(["entered", "left"])
+    appeared = (changes["status"] == "new") & changes["selected_new"]
+    vanished = (changes["status"] == "gone") & changes["selected_old"]
+    return changes[moved | appeared | vanished]
+
+
+def diff_drops(old_drop, new_drop, names=None):
+    """``{name: diff}`` for every ranking snapshotted in both drops."""
+    old_manifest, new_manifest = _read_manifest(old_drop), _read_manifest(new_drop)
+    names = names or [n for n in RANKINGS if n in old_manifest and n in new_manifest]
+    diffs = {}
+    for name in names:
+        old, old_meta = load_snapshot(old_drop, name)
+        new, new_meta = load_snapshot(new_drop, name)
+        diffs[name] = diff(old, new, old_meta, new_meta)
+    return diffs
+
+
+def history(name, drops=None, field="rank"):
+    """Wide table of ``field`` (``rank``, ``selected`` or the metric) per key and drop.
+
+    All snapshots are aligned in one factorization and scattered into a
+    ``keys x drops`` array; keys missing from a drop get NaN.
+    """
+    drops = drops or [d for d in list_drops() if name in _read_manifest(d)]
+    snaps = [load_snapshot(d, name)[0] for d in drops]
+    keys = RANKINGS[name]["keys"]
+    if not snaps:
+        return pd.DataFrame(columns=keys)
+
+    codes, out = _align(snaps, keys)
+    grid = np.full((len(out), len(drops)), np.nan)
+    for j, (snap, c) in enumerate(zip(snaps, codes)):
+        grid[c, j] = snap[field].to_numpy(dtype="float64")
+    return pd.concat([out, pd.DataFrame(grid, columns=list(drops))], axis=1)
+
+
+# %% CLI
+
+def _print_report(diffs):
+    for name, changes in diffs.items():
+        counts = changes["status"].value_counts()
+        print(f"== {name}: " + ", ".join(f"{s} {counts.get(s, 0)}" for s in
+                                         ["entered", "left", "stayed", "new", "gone"]))
+        moved = entered_left(changes)
+        if len(moved):
+            print(moved.to_string(index=False))
+        print()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare ranked outputs between data drops")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_diff = sub.add_parser("diff", help="entered/left keys and rank moves between two drops")
+    p_diff.add_argument("old")
+    p_diff.add_argument("new")
+    p_diff.add_argument("--name", action="append", choices=sorted(RANKINGS))
+    p_diff.add_argument("--out-dir", help="also write each full diff to <out-dir>/<name>.csv")
+    sub.add_parser("drops", help="list snapshotted drops")
+    args = parser.parse_args()
+
+    if args.command == "drops":
+        print("\n".join(list_drops()))
+    else:
+        diffs = diff_drops(args.old, args.new, args.name)
+        _print_report(diffs)
+        if args.out_dir:
+            os.makedirs(args.out_dir, exist_ok=True)
+            for name, changes in diffs.items():
+                changes.to_csv(os.path.join(args.out_dir, f"{name}.csv"), index=False)
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The notebook modules import each other as top-level modules from books/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "books"))
+
+import pipeline  # noqa: E402
+
+STATES = {
+    "Karnataka": ["Bengaluru", "Mysuru", "Tumakuru"],
+    "Bihar": ["Patna", "Gaya"],
+    "Westbengal": ["Kolkata", "Howrah"],
+    "Kerala": ["Idukki"],
+}
+
+
+def raw_frame(kind, n, states=STATES, seed=0):
+    """Synthetic raw rows of source ``kind`` in the CSV exports' layout."""
+    rng = np.random.default_rng(seed)
+    pins, base = [], 560001
+    for state, districts in states.items():
+        for district in districts:
+            pins += [(state, district, base + k) for k in range(4)]
+            base += 1000
+    idx = rng.integers(0, len(pins), n)
+    dates = pd.Timestamp("2025-03-01") + pd.to_timedelta(rng.integers(0, 120, n), unit="D")
+    frame = pd.DataFrame({
+        "date": dates.strftime("%d-%m-%Y"),
+        "state": [pins[i][0] for i in idx],
+        "district": [pins[i][1] for i in idx],
+        "pincode": [pins[i][2] for i in idx],
+    })
+    for column in pipeline.COUNT_COLUMNS[kind]:
+        frame[column] = rng.poisson(rng.uniform(1, 30), n)
+    return frame
+
+
+@pytest.fixture
+def write_raw(tmp_path):
+    """Write raw CSV slices per source; returns ``{kind: [paths]}``."""
+    def write(states=STATES, rows=400, slices=2):
+        paths = {}
+        for seed, kind in enumerate(pipeline.PATHS):
+            frame = raw_frame(kind, rows * slices, states, seed)
+            paths[kind] = []
+            for i, part in enumerate(np.array_split(np.arange(len(frame)), slices)):
+                path = tmp_path / f"{kind}_{i}.csv"
+                frame.iloc[part].to_csv(path, index=False)
+                paths[kind].append(str(path))
+        return paths
+    return write
+
+
+@pytest.fixture
+def no_dedup(monkeypatch):
+    monkeypatch.setattr(pipeline, "DEDUP_DIR", "")
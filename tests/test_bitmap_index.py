@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+import pipeline
+from bitmap_index import build_frame_index
+from conftest import raw_frame
+
+
+def _prepared_bio():
+    bio = pipeline.prepare_bio(raw_frame("bio", 2000))
+    bio.loc[[3, 10], "date"] = pd.NaT
+    bio["month"] = bio["date"].dt.to_period("M")
+    bio.loc[[5, 11], "state"] = np.nan
+    return bio
+
+
+def test_missing_values_are_in_no_bitmap():
+    bio = _prepared_bio()
+    idx = build_frame_index(bio)
+
+    last_month = max(idx.values["month"])
+    rows = idx.eq("month", last_month).to_array()
+    assert not set(rows) & {3, 10}
+    assert len(rows) == (bio["month"] == last_month).sum()
+
+    last_state = max(idx.values["state"])
+    rows = idx.eq("state", last_state).to_array()
+    assert not set(rows) & {5, 11}
+    assert len(rows) == (bio["state"] == last_state).sum()
+
+
+def test_filtered_sums_match_pandas():
+    bio = _prepared_bio()
+    idx = build_frame_index(bio)
+    sel = idx.eq("state", "Bihar") & idx.between("month", "2025-04", "2025-05")
+
+    mask = (bio["state"] == "Bihar") & bio["month"].between(
+        pd.Period("2025-04", "M"), pd.Period("2025-05", "M")
+    )
+    expected = bio.loc[mask, ["bio_age_5_17", "bio_age_17_"]].sum()
+    assert (idx.sum(sel, ["bio_age_5_17", "bio_age_17_"]) == expected).all()
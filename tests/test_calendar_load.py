@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+import pipeline
+from calendar_load import build_calendar_profiles
+from conftest import raw_frame
+
+
+def test_missing_dates_and_districts_are_skipped():
+    enrol = pipeline.prepare_enrol(raw_frame("enrol", 1500, seed=1))
+    demo = pipeline.prepare_demo(raw_frame("demo", 1500, seed=2))
+    bio = pipeline.prepare_bio(raw_frame("bio", 1500, seed=3))
+    clean = {name: frame.copy() for name, frame in [("enrol", enrol), ("demo", demo), ("bio", bio)]}
+    demo.loc[[3, 10], "date"] = pd.NaT
+    demo.loc[[5, 11], "district"] = np.nan
+
+    profiles = build_calendar_profiles(enrol, demo, bio)
+
+    kept = clean["demo"].drop(index=[3, 10, 5, 11])
+    weekday = profiles["demo"]["weekday"]
+    assert not weekday.index.to_frame().isna().any().any()
+    assert weekday.to_numpy().sum() == kept["demo_activity"].sum()
+    expected = kept.groupby(["state", "district"])["demo_activity"].sum()
+    pd.testing.assert_series_equal(
+        profiles["demo"]["daily"].sum(axis=1).loc[expected.index], expected.astype("float64"),
+        check_names=False,
+    )
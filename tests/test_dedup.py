@@ -0,0 +1,93 @@
+import os
+
+import pandas as pd
+import pytest
+
+import pipeline
+
+
+def _rows(start, stop):
+    return pd.DataFrame({
+        "date": [f"{1 + i % 28:02d}-03-2025" for i in range(start, stop)],
+        "state": "Karnataka",
+        "district": "Mysuru",
+        "pincode": [570000 + i for i in range(start, stop)],
+        "age_0_5": range(start, stop),
+        "age_5_17": 1,
+        "age_18_greater": 2,
+    })
+
+
+@pytest.fixture
+def dedup_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "DEDUP_DIR", str(tmp_path / "dedup"))
+    monkeypatch.setattr(pipeline, "_DEDUP_REPORT", {})
+    return tmp_path
+
+
+def _write(path, frame):
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+def test_rerun_drops_nothing(dedup_dir):
+    a = _write(dedup_dir / "a.csv", _rows(0, 10))
+    b = _write(dedup_dir / "b.csv", _rows(10, 20))
+    assert len(pipeline.read_slices([a, b], "enrol")) == 20
+    assert len(pipeline.read_slices([a, b], "enrol")) == 20
+
+
+def test_overlapping_slice_is_dropped(dedup_dir):
+    a = _write(dedup_dir / "a.csv", _rows(0, 10))
+    b = _write(dedup_dir / "b.csv", _rows(5, 15))
+    assert len(pipeline.read_slices([a, b], "enrol")) == 15
+    report = pipeline.dedup_report().set_index("slice")
+    assert report.loc["b.csv", "dropped_seen_in_other_slice"] == 5
+
+
+def test_refreshed_export_replaces_its_rows(dedup_dir):
+    path = dedup_dir / "a.csv"
+    _write(path, _rows(1, 11))
+    assert len(pipeline.read_slices([str(path)], "enrol")) == 10
+
+    # Same file name, one new leading row
+    _write(path, _rows(0, 11))
+    assert len(pipeline.read_slices([str(path)], "enrol")) == 11
+    report = pipeline.dedup_report().iloc[0]
+    assert report["dropped_within_slice"] == 0
+    assert report["dropped_seen_in_other_slice"] == 0
+
+
+def test_slices_no_longer_read_are_released(dedup_dir):
+    old = _write(dedup_dir / "old.csv", _rows(0, 10))
+    pipeline.read_slices([old], "enrol")
+    new = _write(dedup_dir / "new.csv", _rows(0, 12))
+    assert len(pipeline.read_slices([new], "enrol")) == 12
+
+
+def test_repeats_within_a_slice_across_chunks(dedup_dir):
+    from dedup import HashStore, row_hashes
+
+    frame = pd.concat([_rows(0, 10), _rows(3, 4)], ignore_index=True)
+    whole = HashStore(str(dedup_dir / "whole")).claim(row_hashes(frame), "s")[0]
+
+    chunked = HashStore(str(dedup_dir / "chunked"))
+    first = chunked.claim(row_hashes(frame.iloc[:6]), "s", 0)[0]
+    second = chunked.claim(row_hashes(frame.iloc[6:]), "s", 6)[0]
+    assert whole.tolist() == first.tolist() + second.tolist()
+    assert whole.sum() == 10
+
+
+def _read_in_process(dedup_dir, paths):
+    pipeline.DEDUP_DIR = dedup_dir
+    return len(pipeline.read_slices(paths, "enrol"))
+
+
+def test_concurrent_readers_share_a_store(dedup_dir):
+    import multiprocessing
+
+    paths = [_write(dedup_dir / f"{i}.csv", _rows(i * 2000, (i + 1) * 2000)) for i in range(4)]
+    with multiprocessing.get_context("spawn").Pool(4) as pool:
+        counts = pool.starmap(_read_in_process, [(str(dedup_dir / "dedup"), paths)] * 4)
+    assert counts == [8000] * 4
+    assert not [f for f in os.listdir(dedup_dir / "dedup" / "enrol") if f.endswith(".tmp")]
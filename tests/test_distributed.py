@@ -0,0 +1,72 @@
+import multiprocessing as mp
+
+import pandas as pd
+import pytest
+
+import pipeline
+from distributed import AUTHKEY_ENV, resolve_authkey, run_partitioned, serve
+
+
+def _single_process(paths):
+    enrol = pipeline.prepare_enrol(pipeline.read_slices(paths["enrol"]))
+    demo = pipeline.prepare_demo(pipeline.read_slices(paths["demo"]))
+    bio = pipeline.prepare_bio(pipeline.read_slices(paths["bio"]))
+    monthly_load = pipeline.build_monthly_load(demo, bio)
+    consistency_metrics = pipeline.build_consistency_metrics(monthly_load)
+    pincode_df = pipeline.build_pincode_df(enrol, demo, bio, consistency_metrics)
+    return {
+        "monthly_load": monthly_load,
+        "consistency_metrics": consistency_metrics,
+        "pincode_df": pincode_df,
+        "district_df": pipeline.build_district_df(pincode_df),
+    }
+
+
+def _assert_same(outputs, expected):
+    for name, frame in expected.items():
+        pd.testing.assert_frame_equal(
+            outputs[name], frame.reset_index(drop=True)[outputs[name].columns], check_dtype=False
+        )
+
+
+@pytest.mark.parametrize("by, n_workers", [("state", 2), ("district", 3)])
+def test_matches_single_process(write_raw, no_dedup, by, n_workers):
+    paths = write_raw()
+    outputs = run_partitioned(n_workers=n_workers, by=by, paths=paths, chunksize=150)
+    _assert_same(outputs, _single_process(paths))
+
+
+@pytest.mark.parametrize("by", ["state", "district"])
+def test_workers_without_keys(write_raw, no_dedup, by):
+    # One state and one district: most workers receive no rows at all
+    paths = write_raw(states={"Kerala": ["Idukki"]})
+    outputs = run_partitioned(n_workers=3, by=by, paths=paths)
+    _assert_same(outputs, _single_process(paths))
+
+
+def test_remote_workers_on_localhost(write_raw, no_dedup, monkeypatch):
+    monkeypatch.setenv(AUTHKEY_ENV, "test-secret")
+    ctx = mp.get_context("spawn")
+    ready = ctx.Queue()
+    workers = [
+        ctx.Process(target=serve, args=(("localhost", 0), "test-secret", ready))
+        for _ in range(2)
+    ]
+    for worker in workers:
+        worker.start()
+    addresses = [ready.get(timeout=60) for _ in workers]
+
+    paths = write_raw()
+    outputs = run_partitioned(addresses=addresses, paths=paths)
+    for worker in workers:
+        worker.join(timeout=60)
+    _assert_same(outputs, _single_process(paths))
+
+
+def test_authkey_has_no_default(monkeypatch):
+    monkeypatch.delenv(AUTHKEY_ENV, raising=False)
+    with pytest.raises(ValueError):
+        resolve_authkey()
+    with pytest.raises(ValueError):
+        run_partitioned(addresses=[("localhost", 1)])
+    assert resolve_authkey("secret") == b"secret"
@@ -0,0 +1,96 @@
+import asyncio
+from collections import Counter
+
+import pandas as pd
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+import ingest
+import pipeline
+
+KINDS = {resource: kind for kind, resource in ingest.RESOURCES.items()}
+
+
+def _mock_api(frames, overlap=0):
+    """Paginated CSV API; the first request for every page fails with a 503.
+
+    With ``overlap``, each page also repeats the last rows of the one before.
+    """
+    attempts = Counter()
+
+    async def handler(request):
+        kind = KINDS[request.match_info["resource"]]
+        offset, limit = int(request.query["offset"]), int(request.query["limit"])
+        attempts[kind, offset] += 1
+        if attempts[kind, offset] == 1:
+            return web.Response(status=503)
+        page = frames[kind].iloc[max(offset - overlap, 0):offset + limit]
+        return web.Response(text=page.to_csv(index=False) if offset < len(frames[kind]) else "")
+
+    app = web.Application()
+    app.router.add_get("/{resource}", handler)
+    return app, attempts
+
+
+def _fetch(frames, overlap=0, **kwargs):
+    async def run():
+        app, attempts = _mock_api(frames, overlap)
+        server = TestServer(app)
+        await server.start_server()
+        try:
+            fetched = await ingest.fetch_all(
+                base_url=str(server.make_url("/")), page_size=150, max_in_flight=3, **kwargs
+            )
+        finally:
+            await server.close()
+        return fetched, attempts
+    return asyncio.run(run())
+
+
+def _pincode_df(enrol, demo, bio):
+    consistency_metrics = pipeline.build_consistency_metrics(pipeline.build_monthly_load(demo, bio))
+    return pipeline.build_pincode_df(enrol, demo, bio, consistency_metrics)
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(ingest, "BACKOFF_BASE", 0.001)
+
+
+@pytest.fixture
+def csv_sources(write_raw):
+    paths = write_raw()
+    return {kind: pipeline.read_slices(kind_paths) for kind, kind_paths in paths.items()}
+
+
+def test_matches_csv_build(csv_sources, no_dedup):
+    fetched, attempts = _fetch(csv_sources)
+    assert max(attempts.values()) == 2      # every page was retried once
+
+    expected = _pincode_df(*(
+        pipeline._PREPARE[kind](csv_sources[kind].copy()) for kind in ("enrol", "demo", "bio")
+    ))
+    got = _pincode_df(fetched["enrol"], fetched["demo"], fetched["bio"])
+    pd.testing.assert_frame_equal(got, expected, check_dtype=False)
+
+
+def test_overlapping_pages_are_counted_once(csv_sources, tmp_path, monkeypatch):
+    monkeypatch.setattr(pipeline, "DEDUP_DIR", str(tmp_path / "dedup"))
+    sources = {kind: frame.drop_duplicates(ignore_index=True) for kind, frame in csv_sources.items()}
+    fetched, _ = _fetch(sources, overlap=20)
+
+    for kind, frame in sources.items():
+        columns = pipeline.COUNT_COLUMNS[kind]
+        assert (fetched[kind][columns].sum() == frame[columns].sum()).all()
+    report = pipeline.dedup_report().set_index("source")
+    assert (report["dropped_seen_in_other_slice"] > 0).all()
+
+
+def test_source_without_pages(csv_sources, no_dedup):
+    sources = dict(csv_sources, enrol=csv_sources["enrol"].iloc[:0])
+    fetched, _ = _fetch(sources)
+    assert len(fetched["enrol"]) == 0
+    assert list(fetched["enrol"].columns) == (
+        pipeline.PIN_KEYS + ["date", "month"] + pipeline.COUNT_COLUMNS["enrol"] + ["total_enrolments"]
+    )
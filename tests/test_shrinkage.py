@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from shrinkage import shrunk_ratio
+
+
+def _state():
+    """One state whose districts run ~21 updates per enrolment, plus two tiny ones."""
+    rng = np.random.default_rng(0)
+    enrolments = rng.integers(500, 5000, 30)
+    ratios = 21 * np.exp(rng.normal(0, 0.2, 30))
+    frame = pd.DataFrame({
+        "district": [f"d{i}" for i in range(30)],
+        "total_enrolments": enrolments,
+        "total_updates": np.round(enrolments * ratios),
+    })
+    tiny = pd.DataFrame({
+        "district": ["three_enrolments", "no_enrolments"],
+        "total_enrolments": [3, 0],
+        "total_updates": [900, 900],
+    })
+    frame = pd.concat([frame, tiny], ignore_index=True)
+    frame["state"] = "S"
+    return frame.set_index("district")
+
+
+def test_small_denominator_is_pulled_toward_state_norm():
+    frame = _state()
+    shrunk = shrunk_ratio(frame["total_updates"], frame["total_enrolments"], frame["state"])
+    shrunk.index = frame.index
+    raw = frame["total_updates"] / frame["total_enrolments"]
+
+    # The motivating case: 3 enrolments and 900 updates (raw ratio 300)
+    tiny = shrunk.loc["three_enrolments"]
+    assert 21 < tiny["estimate"] < raw["three_enrolments"] / 2
+    assert tiny["lower"] < tiny["estimate"] < tiny["upper"]
+
+    # No enrolments: no ratio, and no place at the top of a ranking
+    assert shrunk.loc["no_enrolments"].isna().all()
+    assert shrunk["lower"].idxmax() != "no_enrolments"
+
+    # Large districts keep (almost) their raw ratio
+    large = frame["total_enrolments"] >= 500
+    assert np.allclose(shrunk.loc[large, "estimate"], raw[large], rtol=0.1)
+
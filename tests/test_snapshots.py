@@ -0,0 +1,51 @@
+import pandas as pd
+import pytest
+
+import pipeline
+import snapshots
+
+
+@pytest.fixture
+def snapshot_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshots, "SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(snapshots, "DROP", "2025-12")
+    return tmp_path
+
+
+def _districts(activity):
+    return pd.DataFrame({
+        "state": "S",
+        "district": [f"d{i}" for i in range(len(activity))],
+        "total_activity": activity,
+    })
+
+
+def test_preview_runs_are_not_recorded(snapshot_dir, monkeypatch):
+    monkeypatch.setattr(pipeline, "PREVIEW_RATE", 0.05)
+    assert snapshots.record(_districts(range(20)), "hotspots") is None
+    assert snapshots.list_drops() == []
+
+    monkeypatch.setattr(pipeline, "PREVIEW_RATE", None)
+    snapshots.record(_districts(range(20)), "hotspots")
+    assert snapshots.list_drops() == ["2025-12"]
+
+
+def test_diff_reports_entered_and_left(snapshot_dir):
+    old = _districts([float(i) for i in range(20)])
+    new = old.assign(total_activity=old["total_activity"].where(old["district"] != "d0", 100.0))
+    snapshots.save_snapshot(old, "hotspots", "old")
+    snapshots.save_snapshot(new, "hotspots", "new")
+
+    changes = snapshots.diff_drops("old", "new")["hotspots"].set_index("district")
+    assert changes.loc["d0", "status"] == "entered"
+    assert changes.loc["d0", "crossed_by"] == "value"
+    assert changes.loc["d0", "rank_new"] == 1
+    assert (changes["status"] == "left").sum() == 1
+
+
+def test_record_without_parquet_engine_says_so(snapshot_dir, monkeypatch):
+    monkeypatch.setattr(pipeline, "PREVIEW_RATE", None)
+    monkeypatch.setattr(snapshots.importlib.util, "find_spec", lambda name: None)
+    with pytest.raises(ImportError, match="pyarrow"):
+        snapshots.record(_districts(range(20)), "hotspots")
+    assert snapshots.list_drops() == []